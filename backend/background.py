@@ -0,0 +1,88 @@
+"""Shared lifecycle for the backend's long-running asyncio tasks.
+
+* ``BackgroundTask`` - runs ``_run`` as a task between ``start`` and ``stop``.
+* ``PeriodicTask`` - calls ``tick`` every ``interval`` seconds.
+* ``QueueWorker`` - handles queued ``(op, key, arg)`` operations one at a
+  time; ``enqueue_once`` skips an operation already waiting for the same
+  key, so bursts of identical requests collapse into one.
+
+The app's lifespan starts every task and stops them on shutdown.
+"""
+import asyncio
+import logging
+from abc import ABC, abstractmethod
+
+logger = logging.getLogger("virgins.background")
+
+
+class BackgroundTask(ABC):
+    def __init__(self):
+        self.task = None
+
+    def start(self):
+        if self.task is None:
+            self.task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self.task is not None:
+            self.task.cancel()
+            try:
+                await self.task
+            except asyncio.CancelledError:
+                pass
+            self.task = None
+
+    @abstractmethod
+    async def _run(self):
+        ...
+
+
+class PeriodicTask(BackgroundTask):
+    def __init__(self, interval: float):
+        super().__init__()
+        self.interval = interval
+
+    @abstractmethod
+    async def tick(self):
+        ...
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.interval)
+            await self.tick()
+
+
+class QueueWorker(BackgroundTask):
+    """Serial worker over a queue of operations; a failed operation is logged and skipped"""
+
+    label = "Background worker"
+
+    def __init__(self):
+        super().__init__()
+        self.queue = asyncio.Queue()
+        self.pending = set()
+
+    def enqueue(self, op: str, key, arg=None):
+        self.queue.put_nowait((op, key, arg))
+
+    def enqueue_once(self, op: str, key):
+        """Queue ``op`` for ``key`` unless it is already waiting to run"""
+        if (op, key) not in self.pending:
+            self.pending.add((op, key))
+            self.queue.put_nowait((op, key, None))
+
+    @abstractmethod
+    async def handle(self, op: str, key, arg):
+        ...
+
+    async def _run(self):
+        while True:
+            op, key, arg = await self.queue.get()
+            # Requests arriving while this one runs queue it again, so none are lost
+            self.pending.discard((op, key))
+            try:
+                await self.handle(op, key, arg)
+            except Exception:
+                logger.exception("%s failed on %s for %s", self.label, op, key)
+            finally:
+                self.queue.task_done()
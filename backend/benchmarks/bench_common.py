@@ -0,0 +1,37 @@
+"""Shared setup for the benchmarks that call server handlers directly.
+
+Importing this module points the app at the ``virgins_bench`` database
+(unless DB_NAME is set), makes ``server`` importable and registers
+``counter``, which counts every MongoDB command. Import it before ``server``:
+the listener must be registered before the client is created.
+"""
+import os
+import sys
+
+from pymongo import monitoring
+from starlette.requests import Request
+
+os.environ.setdefault("DB_NAME", "virgins_bench")
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+
+class CommandCounter(monitoring.CommandListener):
+    def __init__(self):
+        self.count = 0
+
+    def started(self, event):
+        self.count += 1
+
+    def succeeded(self, event):
+        pass
+
+    def failed(self, event):
+        pass
+
+
+counter = CommandCounter()
+monitoring.register(counter)
+
+
+def make_request(uid):
+    return Request({"type": "http", "headers": [(b"x-firebase-uid", uid.encode())]})
@@ -0,0 +1,95 @@
+"""Concurrent stress test for the like/match write path.
+
+Creates many user pairs and fires both sides' likes at the same moment, then
+checks the invariants the like path must hold under concurrency:
+
+* every pair ends up with exactly one match document
+* no like documents are left behind between matched users
+* at least one of the two requests reported the match
+
+    MONGO_URL=mongodb://localhost:27017 python backend/benchmarks/like_stress.py --pairs 500
+"""
+import argparse
+import asyncio
+import sys
+import time
+from datetime import datetime, timezone
+
+# bench_common must come first: it selects the database and registers the command listener
+from bench_common import counter, make_request
+import server
+
+PREFIX = "stress_"
+
+
+def pair_uids(i):
+    return f"{PREFIX}{i}_a", f"{PREFIX}{i}_b"
+
+
+async def clear(pairs):
+    uids = [uid for i in range(pairs) for uid in pair_uids(i)]
+    await asyncio.gather(
+        server.likes_col.delete_many({"fromUserId": {"$regex": f"^{PREFIX}"}}),
+        server.matches_col.delete_many({"users": {"$in": uids}}),
+        server.seen_col.delete_many({"_id": {"$regex": f"^{PREFIX}"}}),
+        server.users_col.delete_many({"firebaseUid": {"$regex": f"^{PREFIX}"}}),
+    )
+    server.seen_sets.cache.entries.clear()
+    return uids
+
+
+async def reset(pairs):
+    """Clear the previous round and insert a live user for each side of every pair"""
+    uids = await clear(pairs)
+    now = datetime.now(timezone.utc).isoformat()
+    await server.users_col.insert_many([
+        {"firebaseUid": uid, "email": f"{uid}@stress.local", "name": uid, "createdAt": now} for uid in uids
+    ])
+
+
+async def like(uid, other):
+    return await server.like_user(make_request(uid), {"toUserId": other})
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--pairs", type=int, default=200)
+    parser.add_argument("--rounds", type=int, default=3)
+    args = parser.parse_args()
+
+    failures = 0
+    for round_no in range(1, args.rounds + 1):
+        await reset(args.pairs)
+        counter.count = 0
+        start = time.perf_counter()
+        results = await asyncio.gather(*[
+            asyncio.gather(like(a, b), like(b, a))
+            for a, b in (pair_uids(i) for i in range(args.pairs))
+        ])
+        elapsed = time.perf_counter() - start
+        commands = counter.count
+
+        for i, (first, second) in enumerate(results):
+            a, b = pair_uids(i)
+            matches = await server.matches_col.count_documents({"users": sorted([a, b])})
+            leftover = await server.likes_col.count_documents({
+                "$or": [{"fromUserId": a, "toUserId": b}, {"fromUserId": b, "toUserId": a}],
+            })
+            reported = first["matched"] or second["matched"]
+            if matches != 1 or leftover or not reported:
+                failures += 1
+                print(f"  pair {i}: matches={matches} leftover_likes={leftover} reported={reported}")
+
+        likes = args.pairs * 2
+        print(
+            f"round {round_no}: {likes} concurrent likes in {elapsed * 1000:.0f} ms, "
+            f"{commands / likes:.2f} Mongo commands per like"
+        )
+
+    await clear(args.pairs)
+    print("OK" if not failures else f"FAILED: {failures} pair(s) violated invariants")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(main()))
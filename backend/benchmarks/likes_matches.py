@@ -0,0 +1,130 @@
+"""Round-trip and latency benchmark for the received-likes and matches endpoints.
+
+Seeds a "popular" user with many incoming likes and matches into a scratch
+database, then compares the previous per-row ``find_one`` implementation with
+the batched endpoints. Every MongoDB command issued during a request is
+counted with a pymongo command listener.
+
+    MONGO_URL=mongodb://localhost:27017 python backend/benchmarks/likes_matches.py --likes 150 --matches 150
+"""
+import argparse
+import asyncio
+import statistics
+import time
+
+# bench_common must come first: it selects the database and registers the command listener
+from bench_common import counter, make_request
+import server
+from starlette.responses import Response
+
+POPULAR_UID = "bench_popular"
+PAGE_SIZE = 50
+
+
+# The implementations replaced by the batched fetch, kept here as the baseline
+async def legacy_received_likes(request):
+    uid = server.get_uid(request)
+    likes = await server.likes_col.find({"toUserId": uid}, {"_id": 0}).to_list(100)
+    matched_user_ids = set()
+    my_matches = await server.matches_col.find({"users": uid}, {"_id": 0}).to_list(100)
+    for m in my_matches:
+        for u in m.get("users", []):
+            if u != uid:
+                matched_user_ids.add(u)
+    result = []
+    for like in likes:
+        from_id = like["fromUserId"]
+        if from_id in matched_user_ids:
+            continue
+        user = await server.users_col.find_one({"firebaseUid": from_id}, {"_id": 0})
+        if user:
+            result.append({**user, "likedAt": like.get("createdAt")})
+    return result
+
+
+async def legacy_matches(request):
+    uid = server.get_uid(request)
+    my_matches = await server.matches_col.find({"users": uid}, {"_id": 0}).to_list(100)
+    result = []
+    for m in my_matches:
+        other_uid = [u for u in m.get("users", []) if u != uid]
+        if other_uid:
+            other_user = await server.users_col.find_one({"firebaseUid": other_uid[0]}, {"_id": 0})
+            if other_user:
+                result.append({
+                    "matchedUser": other_user,
+                    "createdAt": m.get("createdAt"),
+                    "lastMessage": m.get("lastMessage"),
+                    "lastMessageAt": m.get("lastMessageAt"),
+                })
+    return result
+
+
+async def seed(n_likes, n_matches):
+    await server.users_col.delete_many({"firebaseUid": {"$regex": "^bench_"}})
+    await server.likes_col.delete_many({"toUserId": POPULAR_UID})
+    await server.matches_col.delete_many({"users": POPULAR_UID})
+
+    now = server.datetime.now(server.timezone.utc).isoformat()
+    template = {k: v for k, v in server.MOCK_USERS[0].items() if k != "_id"}
+    users = [{**template, "firebaseUid": POPULAR_UID, "email": "popular@bench.local"}]
+    users += [
+        {**template, "firebaseUid": f"bench_fan_{i}", "email": f"fan{i}@bench.local", "name": f"Fan {i}"}
+        for i in range(n_likes + n_matches)
+    ]
+    await server.users_col.insert_many(users, ordered=False)
+    if n_likes:
+        await server.likes_col.insert_many([
+            {"fromUserId": f"bench_fan_{i}", "toUserId": POPULAR_UID, "createdAt": now}
+            for i in range(n_likes)
+        ])
+    if n_matches:
+        await server.matches_col.insert_many([
+            {"users": sorted([POPULAR_UID, f"bench_fan_{n_likes + i}"]), "createdAt": now,
+             "lastMessage": None, "lastMessageAt": None, "lastActivityAt": now}
+            for i in range(n_matches)
+        ])
+
+
+async def paged_received_likes(request):
+    return await server.get_received_likes(request, Response(), limit=PAGE_SIZE, cursor=None)
+
+
+async def paged_matches(request):
+    return await server.get_matches(request, Response(), limit=PAGE_SIZE, cursor=None)
+
+
+async def measure(name, handler, iterations):
+    request = make_request(POPULAR_UID)
+    await handler(request)  # warm up connection pool
+    latencies = []
+    counter.count = 0
+    for _ in range(iterations):
+        start = time.perf_counter()
+        await handler(request)
+        latencies.append((time.perf_counter() - start) * 1000)
+    latencies.sort()
+    p99 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))]
+    print(
+        f"{name:<28} round trips/request: {counter.count / iterations:6.1f}   "
+        f"p50: {statistics.median(latencies):7.2f} ms   p99: {p99:7.2f} ms"
+    )
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--likes", type=int, default=100)
+    parser.add_argument("--matches", type=int, default=100)
+    parser.add_argument("--iterations", type=int, default=200)
+    args = parser.parse_args()
+
+    await seed(args.likes, args.matches)
+    print(f"Popular user with {args.likes} received likes and {args.matches} matches\n")
+    await measure("received likes (before)", legacy_received_likes, args.iterations)
+    await measure("received likes (first page)", paged_received_likes, args.iterations)
+    await measure("matches (before)", legacy_matches, args.iterations)
+    await measure("matches (first page)", paged_matches, args.iterations)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,288 @@
+"""Async load generator and latency benchmark for the FastAPI backend.
+
+Drives many concurrent virtual users through the core journey
+
+    signup -> profile update -> discover -> like -> match -> matches list
+
+either in-process (ASGI transport, app lifespan included) or against a running
+server, and reports per-endpoint throughput and p50/p95/p99 latency with a
+histogram. Results can be written as JSON and compared against thresholds or a
+previous run so regressions fail the command before deploy. In-process runs
+use the ``virgins_bench`` database unless DB_NAME is set, and delete the
+users, likes and matches they created when they finish.
+
+    python backend/benchmarks/loadtest.py --in-process --users 50 --iterations 5 --output load.json
+    python backend/benchmarks/loadtest.py --base-url http://localhost:8001 --users 200 \\
+        --threshold "GET /api/users/discover=250" --baseline previous.json --tolerance 0.2
+"""
+import argparse
+import asyncio
+import bisect
+import json
+import math
+import os
+import sys
+import time
+import uuid
+from collections import defaultdict
+
+import httpx
+
+os.environ.setdefault("DB_NAME", "virgins_bench")
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+# Upper bounds (ms) of the latency histogram buckets
+HISTOGRAM_BUCKETS = [1, 2, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000]
+
+
+def percentile(sorted_values, pct):
+    """Nearest-rank percentile of an already sorted list"""
+    rank = max(math.ceil(pct / 100 * len(sorted_values)) - 1, 0)
+    return sorted_values[rank]
+
+
+class Recorder:
+    """Collects latencies and status codes per endpoint label"""
+
+    def __init__(self):
+        self.latencies = defaultdict(list)
+        self.statuses = defaultdict(lambda: defaultdict(int))
+        self.errors = defaultdict(int)
+        self.started = None
+        self.finished = None
+
+    def record(self, label, elapsed_ms, status):
+        self.latencies[label].append(elapsed_ms)
+        self.statuses[label][str(status)] += 1
+
+    def report(self):
+        duration = max((self.finished or time.perf_counter()) - self.started, 1e-9)
+        endpoints = {}
+        for label in sorted(self.latencies):
+            values = sorted(self.latencies[label])
+            histogram = {}
+            below = 0
+            for bound in HISTOGRAM_BUCKETS:
+                upto = bisect.bisect_right(values, bound)
+                histogram[f"le_{bound}ms"] = upto - below
+                below = upto
+            histogram[f"gt_{HISTOGRAM_BUCKETS[-1]}ms"] = len(values) - below
+            endpoints[label] = {
+                "requests": len(values),
+                "errors": self.errors[label],
+                "statuses": dict(self.statuses[label]),
+                "throughput": round(len(values) / duration, 2),
+                "p50": round(percentile(values, 50), 2),
+                "p95": round(percentile(values, 95), 2),
+                "p99": round(percentile(values, 99), 2),
+                "max": round(values[-1], 2),
+                "histogram": histogram,
+            }
+        total = sum(len(v) for v in self.latencies.values())
+        return {
+            "durationSeconds": round(duration, 2),
+            "totalRequests": total,
+            "throughput": round(total / duration, 2),
+            "endpoints": endpoints,
+        }
+
+
+class VirtualUser:
+    def __init__(self, client, recorder, index, gender):
+        self.client = client
+        self.recorder = recorder
+        self.index = index
+        self.gender = gender
+        self.uid = None
+
+    async def call(self, label, method, path, **kwargs):
+        headers = kwargs.pop("headers", {})
+        if self.uid:
+            headers["x-firebase-uid"] = self.uid
+        start = time.perf_counter()
+        try:
+            response = await self.client.request(method, path, headers=headers, **kwargs)
+        except httpx.HTTPError:
+            self.recorder.errors[label] += 1
+            return None
+        elapsed = (time.perf_counter() - start) * 1000
+        self.recorder.record(label, elapsed, response.status_code)
+        if response.status_code >= 400:
+            self.recorder.errors[label] += 1
+        return response
+
+    async def signup(self, run_id):
+        response = await self.call("POST /api/auth/signup", "POST", "/api/auth/signup", json={
+            "name": f"Load User {self.index}",
+            "email": f"load_{run_id}_{self.index}@loadtest.local",
+            "password": "loadtest-password",
+        })
+        if response is None or response.status_code != 200:
+            return False
+        self.uid = response.json()["uid"]
+        await self.call("PUT /api/users/me", "PUT", "/api/users/me", json={
+            "gender": self.gender,
+            "age": 22 + self.index % 12,
+            "faithLevel": "Practicing",
+            "denomination": "Baptist" if self.index % 3 else "Non-Denominational",
+            "values": ["Family", "Faith", "Purity"][: 1 + self.index % 3],
+            "intention": "Marriage in 1-2 years",
+            "lifestyle": "Traditional",
+        })
+        return True
+
+    async def session(self, partner_uid, likes_per_session):
+        other_gender = "Male" if self.gender == "Female" else "Female"
+        response = await self.call(
+            "GET /api/users/discover", "GET", "/api/users/discover",
+            params={"gender": other_gender, "min_age": 18, "max_age": 50},
+        )
+        candidates = response.json() if response is not None and response.status_code == 200 else []
+        targets = [c["firebaseUid"] for c in candidates[:likes_per_session] if c.get("firebaseUid")]
+        if partner_uid:
+            # Paired users like each other so the run exercises the match path
+            targets.append(partner_uid)
+        for target in targets:
+            await self.call("POST /api/likes", "POST", "/api/likes", json={"toUserId": target})
+        await self.call("GET /api/matches", "GET", "/api/matches")
+        await self.call("GET /api/likes/received", "GET", "/api/likes/received")
+
+
+async def run_load(client, args, run_id):
+    recorder = Recorder()
+    users = [
+        VirtualUser(client, recorder, i, "Female" if i % 2 else "Male")
+        for i in range(args.users)
+    ]
+
+    recorder.started = time.perf_counter()
+    semaphore = asyncio.Semaphore(args.concurrency or args.users)
+
+    async def signup(user, delay):
+        await asyncio.sleep(delay)
+        async with semaphore:
+            await user.signup(run_id)
+
+    ramp = args.ramp_up / max(args.users, 1)
+    await asyncio.gather(*[signup(u, i * ramp) for i, u in enumerate(users)])
+
+    async def journey(user, partner):
+        for _ in range(args.iterations):
+            async with semaphore:
+                await user.session(partner.uid if partner else None, args.likes_per_session)
+
+    # Neighbouring virtual users have opposite genders and are paired up
+    await asyncio.gather(*[
+        journey(u, users[i ^ 1] if (i ^ 1) < len(users) else None)
+        for i, u in enumerate(users) if u.uid
+    ])
+    recorder.finished = time.perf_counter()
+    return recorder.report()
+
+
+async def clear_run(server, run_id):
+    """Delete the users of one in-process run with their likes, matches, decks and seen-sets"""
+    from seeding import adjust_stats_totals
+
+    users = await server.users_col.find(
+        {"email": {"$regex": f"^load_{run_id}_"}}, {"_id": 0, "firebaseUid": 1}
+    ).to_list(None)
+    uids = [u["firebaseUid"] for u in users]
+    if not uids:
+        return
+    likes = await server.likes_col.delete_many({"$or": [{"fromUserId": {"$in": uids}}, {"toUserId": {"$in": uids}}]})
+    matches = await server.matches_col.delete_many({"users": {"$in": uids}})
+    await server.decks_col.delete_many({"userId": {"$in": uids}})
+    await server.seen_col.delete_many({"_id": {"$in": uids}})
+    removed = await server.users_col.delete_many({"firebaseUid": {"$in": uids}})
+    await adjust_stats_totals(server.db, {
+        "users": -removed.deleted_count, "likes": -likes.deleted_count, "matches": -matches.deleted_count,
+    })
+
+
+def check_regressions(report, thresholds, baseline, tolerance):
+    failures = []
+    endpoints = report["endpoints"]
+    for label, limit in thresholds.items():
+        stats = endpoints.get(label)
+        if stats and stats["p99"] > limit:
+            failures.append(f"{label}: p99 {stats['p99']} ms exceeds threshold {limit} ms")
+    if baseline:
+        for label, previous in baseline.get("endpoints", {}).items():
+            stats = endpoints.get(label)
+            if stats and stats["p99"] > previous["p99"] * (1 + tolerance):
+                failures.append(
+                    f"{label}: p99 {stats['p99']} ms regressed from {previous['p99']} ms "
+                    f"(tolerance {tolerance:.0%})"
+                )
+    return failures
+
+
+def print_report(report):
+    print(f"\n{report['totalRequests']} requests in {report['durationSeconds']} s "
+          f"({report['throughput']} req/s)\n")
+    print(f"{'endpoint':<28} {'reqs':>6} {'err':>5} {'req/s':>8} {'p50':>8} {'p95':>8} {'p99':>8} {'max':>8}")
+    for label, s in report["endpoints"].items():
+        print(f"{label:<28} {s['requests']:>6} {s['errors']:>5} {s['throughput']:>8} "
+              f"{s['p50']:>8} {s['p95']:>8} {s['p99']:>8} {s['max']:>8}")
+
+
+def parse_thresholds(values):
+    thresholds = {}
+    for value in values:
+        label, _, limit = value.rpartition("=")
+        if not label:
+            raise SystemExit(f"Invalid threshold {value!r}; expected 'METHOD /path=milliseconds'")
+        thresholds[label] = float(limit)
+    return thresholds
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="Async load test for the VIRGINS backend")
+    target = parser.add_mutually_exclusive_group(required=True)
+    target.add_argument("--base-url", help="URL of a running server, e.g. http://localhost:8001")
+    target.add_argument("--in-process", action="store_true", help="drive backend/server.py through ASGI")
+    parser.add_argument("--users", type=int, default=20, help="virtual users")
+    parser.add_argument("--iterations", type=int, default=3, help="discover/like sessions per user")
+    parser.add_argument("--likes-per-session", type=int, default=3)
+    parser.add_argument("--concurrency", type=int, default=0, help="max in-flight sessions (default: all users)")
+    parser.add_argument("--ramp-up", type=float, default=0.0, help="seconds over which signups are spread")
+    parser.add_argument("--output", help="write the JSON report here")
+    parser.add_argument("--threshold", action="append", default=[], help="'METHOD /path=ms' p99 limit")
+    parser.add_argument("--baseline", help="previous JSON report to compare p99 against")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="allowed p99 growth over the baseline")
+    args = parser.parse_args()
+
+    limits = httpx.Limits(max_connections=max(args.users, 10))
+    run_id = uuid.uuid4().hex[:8]
+    if args.in_process:
+        import server
+
+        async with server.app.router.lifespan_context(server.app):
+            try:
+                transport = httpx.ASGITransport(app=server.app)
+                async with httpx.AsyncClient(transport=transport, base_url="http://loadtest", timeout=60) as client:
+                    report = await run_load(client, args, run_id)
+            finally:
+                await clear_run(server, run_id)
+    else:
+        async with httpx.AsyncClient(base_url=args.base_url, limits=limits, timeout=60) as client:
+            report = await run_load(client, args, run_id)
+
+    print_report(report)
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+
+    baseline = None
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+    failures = check_regressions(report, parse_thresholds(args.threshold), baseline, args.tolerance)
+    for failure in failures:
+        print(f"REGRESSION {failure}")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(main()))
@@ -0,0 +1,108 @@
+"""Latency benchmark for reciprocal (two-sided) covenant scoring.
+
+Reciprocal discover scores every candidate in both directions. This compares
+the forward-only and reciprocal cost of
+
+* the batch scorer (``calculate_covenant_scores``) on synthetic candidate
+  pages of several sizes, in process and without a database
+* with ``--pipeline``, ranked discover (``discover_ranked``) against a
+  synthetic population loaded into a scratch database
+
+and fails when a reciprocal p95 exceeds the latency budget.
+
+    python backend/benchmarks/reciprocal_scoring.py --sizes 50,200,1000,5000
+    MONGO_URL=mongodb://localhost:27017 python backend/benchmarks/reciprocal_scoring.py --pipeline --population 50000
+"""
+import argparse
+import asyncio
+import os
+import random
+import statistics
+import sys
+import time
+from datetime import datetime, timezone
+
+os.environ.setdefault("DB_NAME", "virgins_bench")
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+import server  # noqa: E402
+from seeding import clear_population, generate_user, seed_population  # noqa: E402
+from starlette.responses import Response  # noqa: E402
+
+PREFIX = "recip_"
+
+
+def p95(samples):
+    return sorted(samples)[max(int(len(samples) * 0.95) - 1, 0)]
+
+
+def summarize(label, forward, reciprocal):
+    f50, r50 = statistics.median(forward), statistics.median(reciprocal)
+    print(f"{label:<24} {f50:>9.2f} {p95(forward):>9.2f} {r50:>9.2f} {p95(reciprocal):>9.2f} {r50 / max(f50, 1e-9):>6.2f}x")
+    return p95(reciprocal)
+
+
+def header(title):
+    print(f"\n{title}")
+    print(f"{'':<24} {'fwd p50':>9} {'fwd p95':>9} {'recip p50':>9} {'recip p95':>9} {'ratio':>7}  (ms)")
+
+
+def bench_scorer(sizes, rounds, rng):
+    header("batch scorer")
+    now = datetime.now(timezone.utc)
+    viewer = generate_user(1, rng, now, PREFIX)
+    worst = 0.0
+    for size in sizes:
+        candidates = [generate_user(2 * i, rng, now, PREFIX) for i in range(size)]
+        timings = {False: [], True: []}
+        for _ in range(rounds):
+            for reciprocal in (False, True):
+                start = time.perf_counter()
+                server.calculate_covenant_scores(viewer, candidates, reciprocal=reciprocal)
+                timings[reciprocal].append((time.perf_counter() - start) * 1000)
+        worst = max(worst, summarize(f"{size} candidates", timings[False], timings[True]))
+    return worst
+
+
+async def bench_pipeline(population, limit, rounds, seed):
+    header(f"ranked discover over {population:,} users, page of {limit}")
+    await clear_population(server.db, PREFIX)
+    await seed_population(server.db, users=population, likes_per_user=0, seed=seed, prefix=PREFIX)
+    viewer = await server.users_col.find_one({"firebaseUid": f"{PREFIX}{1:08d}"}, {"_id": 0})
+    query = {"firebaseUid": {"$regex": f"^{PREFIX}"}, "gender": "Female", **server.NOT_DELETED}
+    timings = {False: [], True: []}
+    try:
+        for _ in range(rounds):
+            for reciprocal in (False, True):
+                start = time.perf_counter()
+                await server.discover_ranked(Response(), viewer, query, limit, None, reciprocal=reciprocal)
+                timings[reciprocal].append((time.perf_counter() - start) * 1000)
+    finally:
+        await clear_population(server.db, PREFIX)
+    return summarize("discover_ranked", timings[False], timings[True])
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", default="50,200,1000,5000", help="comma-separated candidate counts")
+    parser.add_argument("--rounds", type=int, default=50)
+    parser.add_argument("--pipeline", action="store_true", help="also time ranked discover against MongoDB")
+    parser.add_argument("--population", type=int, default=20000)
+    parser.add_argument("--limit", type=int, default=50)
+    parser.add_argument("--budget-ms", type=float, default=250.0, help="maximum reciprocal p95")
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    worst = bench_scorer([int(s) for s in args.sizes.split(",")], args.rounds, random.Random(args.seed))
+    if args.pipeline:
+        worst = max(worst, await bench_pipeline(args.population, args.limit, args.rounds, args.seed))
+
+    if worst > args.budget_ms:
+        print(f"\nFAILED: reciprocal p95 {worst:.2f} ms exceeds the {args.budget_ms:g} ms budget")
+        return 1
+    print(f"\nOK: reciprocal p95 {worst:.2f} ms within the {args.budget_ms:g} ms budget")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(main()))
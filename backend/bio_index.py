@@ -0,0 +1,333 @@
+"""Local bio-similarity index for "people like you" recommendations.
+
+Bios are embedded as hashed n-gram TF-IDF vectors: words, word bigrams and
+character trigrams are hashed into ``dim`` signed buckets, weighted by
+``1 + log(tf)`` and the bucket's IDF, and L2-normalized. No model or
+external service is involved; everything runs on the CPU with NumPy.
+
+An index is a directory of memory-mapped files:
+
+* ``vectors.f32`` - float32 matrix, one row per user
+* ``uids.bin`` - the firebaseUid of each row, fixed width
+* ``idf.f32`` - per-bucket IDF, computed by the offline build
+* ``meta.json`` - dim, row count, capacity and build id
+
+``BioIndex.upsert`` rewrites or appends one row in place when a bio
+changes. Appends take a file lock, so several workers on one host can share
+an index; each notices rows appended by the others, and a rebuild swapped in
+by the CLI, at its next query. The IDF only changes on a rebuild.
+
+    python backend/bio_index.py --build
+    python backend/bio_index.py --similar <firebaseUid> -k 10
+"""
+import argparse
+import asyncio
+import fcntl
+import json
+import math
+import os
+import re
+import shutil
+import threading
+import time
+import uuid
+import zlib
+from collections import Counter
+
+import numpy as np
+
+DEFAULT_DIM = 512
+UID_WIDTH = 64
+INITIAL_CAPACITY = 1024
+BUILD_CHUNK_ROWS = 8192
+
+WORD_RE = re.compile(r"[a-z0-9']+")
+
+
+def bio_features(text: str):
+    words = WORD_RE.findall((text or "").lower())
+    for word in words:
+        yield "w:" + word
+        padded = f" {word} "
+        for i in range(len(padded) - 2):
+            yield "c:" + padded[i:i + 3]
+    for first, second in zip(words, words[1:]):
+        yield f"b:{first} {second}"
+
+
+def term_vector(text: str, dim: int) -> np.ndarray:
+    """Unweighted hashed term-frequency vector (1 + log tf per feature)"""
+    vector = np.zeros(dim, dtype=np.float32)
+    for feature, count in Counter(bio_features(text)).items():
+        h = zlib.crc32(feature.encode())
+        vector[h % dim] += (1.0 + math.log(count)) * (1.0 if h & 0x80000000 else -1.0)
+    return vector
+
+
+def _normalize(rows: np.ndarray):
+    norms = np.linalg.norm(rows, axis=-1, keepdims=True)
+    np.divide(rows, norms, out=rows, where=norms > 0)
+
+
+class BioIndex:
+    """Memory-mapped bio vectors keyed by firebaseUid.
+
+    Until ``open`` succeeds the index is empty: writes are dropped and
+    queries find nothing.
+    """
+
+    def __init__(self, path: str, dim: int = DEFAULT_DIM):
+        self.path = path
+        self.dim = dim
+        self.lock = threading.Lock()
+        self.build_id = None
+        self.count = 0
+        self.capacity = 0
+        self.vectors = None
+        self.uids = None
+        self.idf = None
+        self.rows = {}
+        self.meta_mtime = None
+
+    # ----- files -----
+    def _file(self, name):
+        return os.path.join(self.path, name)
+
+    def _read_meta(self):
+        with open(self._file("meta.json")) as f:
+            return json.load(f)
+
+    def _write_meta(self):
+        meta = {"dim": self.dim, "count": self.count, "capacity": self.capacity, "buildId": self.build_id}
+        tmp = self._file(f"meta.json.{uuid.uuid4().hex}")
+        with open(tmp, "w") as f:
+            json.dump(meta, f)
+        os.replace(tmp, self._file("meta.json"))
+        self.meta_mtime = os.stat(self._file("meta.json")).st_mtime_ns
+
+    def _map(self, meta):
+        self.dim = meta["dim"]
+        self.capacity = meta["capacity"]
+        self.build_id = meta["buildId"]
+        self.vectors = np.memmap(self._file("vectors.f32"), dtype=np.float32, mode="r+",
+                                 shape=(self.capacity, self.dim))
+        self.uids = np.memmap(self._file("uids.bin"), dtype=f"S{UID_WIDTH}", mode="r+", shape=(self.capacity,))
+        self.idf = np.fromfile(self._file("idf.f32"), dtype=np.float32)
+        self.count = 0
+        self.rows = {}
+        self._index_rows(meta["count"])
+
+    def _index_rows(self, count):
+        for row in range(self.count, count):
+            self.rows[self.uids[row].decode()] = row
+        self.count = count
+
+    @staticmethod
+    def create(path: str, dim: int = DEFAULT_DIM, capacity: int = INITIAL_CAPACITY, idf=None):
+        """Write an empty index at ``path``"""
+        os.makedirs(path, exist_ok=True)
+        with open(os.path.join(path, "vectors.f32"), "wb") as f:
+            f.truncate(capacity * dim * 4)
+        with open(os.path.join(path, "uids.bin"), "wb") as f:
+            f.truncate(capacity * UID_WIDTH)
+        (np.ones(dim, dtype=np.float32) if idf is None else idf.astype(np.float32)).tofile(
+            os.path.join(path, "idf.f32")
+        )
+        index = BioIndex(path, dim)
+        index.capacity = capacity
+        index.build_id = uuid.uuid4().hex
+        index._write_meta()
+        return index
+
+    def open(self):
+        """Map the index, creating an empty one if none exists yet"""
+        with self.lock:
+            if not os.path.exists(self._file("meta.json")):
+                BioIndex.create(self.path, self.dim)
+            meta = self._read_meta()
+            self._map(meta)
+            self.meta_mtime = os.stat(self._file("meta.json")).st_mtime_ns
+        return self
+
+    def _refresh(self):
+        """Pick up rows appended or a rebuild swapped in by another process"""
+        try:
+            mtime = os.stat(self._file("meta.json")).st_mtime_ns
+        except FileNotFoundError:
+            return
+        if mtime == self.meta_mtime:
+            return
+        meta = self._read_meta()
+        if meta["buildId"] != self.build_id or meta["capacity"] != self.capacity:
+            self._map(meta)
+        else:
+            self._index_rows(meta["count"])
+        self.meta_mtime = mtime
+
+    def _grow(self):
+        capacity = max(self.capacity * 2, INITIAL_CAPACITY)
+        self.vectors.flush()
+        self.uids.flush()
+        with open(self._file("vectors.f32"), "r+b") as f:
+            f.truncate(capacity * self.dim * 4)
+        with open(self._file("uids.bin"), "r+b") as f:
+            f.truncate(capacity * UID_WIDTH)
+        self._map({"dim": self.dim, "count": self.count, "capacity": capacity, "buildId": self.build_id})
+
+    # ----- reads and writes -----
+    def embed(self, text: str) -> np.ndarray:
+        vector = term_vector(text, self.dim) * self.idf
+        _normalize(vector)
+        return vector
+
+    def upsert(self, uid: str, bio: str):
+        """Store the embedding of ``bio`` as the user's row"""
+        if self.vectors is None:
+            return
+        vector = self.embed(bio)
+        with self.lock:
+            self._refresh()
+            row = self.rows.get(uid)
+            if row is not None:
+                self.vectors[row] = vector
+                return
+            with open(self._file("meta.json.lock"), "w") as lock_file:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+                self._refresh()
+                row = self.rows.get(uid)
+                if row is None:
+                    if self.count == self.capacity:
+                        self._grow()
+                    row = self.count
+                    self.uids[row] = uid.encode()[:UID_WIDTH]
+                    self.rows[uid] = row
+                    self.count += 1
+                self.vectors[row] = vector
+                self._write_meta()
+
+    def remove(self, uid: str):
+        """Zero the user's row so it never ranks as similar"""
+        if self.vectors is None:
+            return
+        with self.lock:
+            self._refresh()
+            row = self.rows.get(uid)
+            if row is not None:
+                self.vectors[row] = 0
+
+    def vector_for(self, uid: str):
+        if self.vectors is None:
+            return None
+        with self.lock:
+            self._refresh()
+            row = self.rows.get(uid)
+            return None if row is None else np.array(self.vectors[row])
+
+    def similar(self, uid: str, k: int, min_similarity: float = 0.0):
+        """Top ``k`` (uid, cosine similarity) pairs for a user's bio, best first"""
+        vector = self.vector_for(uid)
+        if vector is None or not vector.any():
+            return []
+        with self.lock:
+            count = self.count
+            scores = self.vectors[:count] @ vector
+            own = self.rows.get(uid)
+            if own is not None:
+                scores[own] = -1.0
+            k = min(k, count)
+            if k <= 0:
+                return []
+            top = np.argpartition(-scores, k - 1)[:k]
+            top = top[np.argsort(-scores[top], kind="stable")]
+            return [(self.uids[row].decode(), float(scores[row])) for row in top if scores[row] > min_similarity]
+
+    def similarities(self, uid: str, candidates) -> dict:
+        """Cosine similarity between a user's bio and each candidate's; 0 when either is missing"""
+        vector = self.vector_for(uid)
+        if vector is None:
+            return {c: 0.0 for c in candidates}
+        with self.lock:
+            rows = [self.rows.get(c) for c in candidates]
+            present = [row for row in rows if row is not None]
+            scores = iter((self.vectors[present] @ vector).tolist() if present else ())
+            return {c: (next(scores) if row is not None else 0.0) for c, row in zip(candidates, rows)}
+
+
+async def build(users, path: str, dim: int = DEFAULT_DIM, batch_size: int = 5000, log=None) -> dict:
+    """Build a fresh index from every user's bio and swap it in at ``path``.
+
+    Term vectors are streamed into the memmap first; document frequencies
+    are then counted per bucket and the rows re-weighted by IDF in chunks,
+    so the corpus never has to fit in memory.
+    """
+    started = time.perf_counter()
+    staging = f"{path}.building"
+    shutil.rmtree(staging, ignore_errors=True)
+    index = BioIndex.create(staging, dim).open()
+
+    cursor = users.find({"deletedAt": {"$exists": False}}, {"_id": 0, "firebaseUid": 1, "bio": 1})
+    async for user in cursor.batch_size(batch_size):
+        uid = user.get("firebaseUid")
+        if not uid:
+            continue
+        if index.count == index.capacity:
+            index._grow()
+        index.uids[index.count] = uid.encode()[:UID_WIDTH]
+        index.vectors[index.count] = term_vector(user.get("bio", ""), dim)
+        index.count += 1
+        if log and index.count % batch_size == 0:
+            log(f"embedded: {index.count:,}")
+
+    count = index.count
+    df = np.zeros(dim, dtype=np.int64)
+    for start in range(0, count, BUILD_CHUNK_ROWS):
+        df += np.count_nonzero(index.vectors[start:start + BUILD_CHUNK_ROWS], axis=0)
+    idf = (np.log((1 + count) / (1 + df)) + 1).astype(np.float32)
+    for start in range(0, count, BUILD_CHUNK_ROWS):
+        chunk = np.array(index.vectors[start:start + BUILD_CHUNK_ROWS]) * idf
+        _normalize(chunk)
+        index.vectors[start:start + BUILD_CHUNK_ROWS] = chunk
+    index.vectors.flush()
+    index.uids.flush()
+    idf.tofile(index._file("idf.f32"))
+    index._write_meta()
+
+    # Running servers notice the new buildId and remap
+    previous = f"{path}.previous"
+    shutil.rmtree(previous, ignore_errors=True)
+    if os.path.exists(path):
+        os.replace(path, previous)
+    os.replace(staging, path)
+    shutil.rmtree(previous, ignore_errors=True)
+    return {"users": count, "dim": dim, "seconds": round(time.perf_counter() - started, 2)}
+
+
+async def _main():
+    from dotenv import load_dotenv
+    from motor.motor_asyncio import AsyncIOMotorClient
+
+    load_dotenv()
+    default_path = os.environ.get(
+        "BIO_INDEX_PATH", os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "bio_index")
+    )
+    parser = argparse.ArgumentParser(description="Build or query the local bio-similarity index")
+    parser.add_argument("--path", default=default_path)
+    parser.add_argument("--dim", type=int, default=int(os.environ.get("BIO_INDEX_DIM", DEFAULT_DIM)))
+    parser.add_argument("--build", action="store_true", help="rebuild the index from MongoDB")
+    parser.add_argument("--batch-size", type=int, default=5000)
+    parser.add_argument("--similar", metavar="UID", help="print the users whose bios are closest to UID's")
+    parser.add_argument("-k", type=int, default=10)
+    args = parser.parse_args()
+
+    if args.build:
+        client = AsyncIOMotorClient(os.environ.get("MONGO_URL"))
+        db = client[os.environ.get("DB_NAME", "virgins_db")]
+        report = await build(db["users"], args.path, args.dim, args.batch_size, log=lambda line: print(" ", line))
+        print("built:", report)
+    if args.similar:
+        for uid, similarity in BioIndex(args.path, args.dim).open().similar(args.similar, args.k):
+            print(f"{similarity:.3f}  {uid}")
+
+
+if __name__ == "__main__":
+    asyncio.run(_main())
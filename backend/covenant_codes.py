@@ -0,0 +1,138 @@
+"""Compact encoded form of the profile fields the covenant score reads.
+
+Each user document carries ``covenantCodes`` next to the readable fields:
+
+* ``values`` - a bitmask with bit ``i`` set for ``VALUES[i]``
+* ``faith``, ``faithLevel``, ``denomination``, ``intention``, ``lifestyle`` -
+  small integer codes, ``VOCABULARIES[field].index(value) + 1``; 0 means the
+  field is empty or holds a value outside the vocabulary
+* ``v`` - CODES_VERSION, so documents encoded with an older vocabulary are
+  found and re-encoded by the backfill
+
+The scorer can then count shared values with a popcount and score the
+categorical fields with integer table lookups, in Python and in MongoDB.
+The vocabularies are append-only: reordering them changes existing codes.
+
+Codes are written by the profile write paths and by the startup migration;
+to re-encode a database by hand:
+
+    python backend/covenant_codes.py --backfill
+"""
+import argparse
+import asyncio
+import hashlib
+import os
+import time
+
+from bson import Int64
+from pymongo import UpdateOne
+
+VALUES = (
+    "Family", "Purity", "Faith", "Kindness", "Tradition", "Leadership", "Education", "Pro-Life",
+    "Homeschooling", "Career", "Travel", "Music", "Sports", "Service", "Missions", "Fitness",
+    "Cooking", "Art", "Community Service", "Commitment", "Marriage", "Children", "Respect",
+    "Honesty", "Loyalty",
+)
+# Bit 62 is the highest one an aggregation can test exactly with Int64 $mod
+assert len(VALUES) <= 62, "the values bitmask holds at most 62 values"
+
+VOCABULARIES = {
+    "faith": ("Christian", "Catholic"),
+    "faithLevel": ("Very Serious", "Practicing", "Cultural", "Exploring"),
+    "denomination": (
+        "Non-Denominational", "Baptist", "Catholic", "Methodist", "Presbyterian", "Reformed",
+        "Lutheran", "Pentecostal", "Anglican", "Orthodox", "Other",
+    ),
+    "intention": ("Marriage ASAP", "Marriage in 1-2 years", "Dating to Marry", "Unsure"),
+    "lifestyle": ("Traditional", "Moderate", "Modern"),
+}
+
+VALUE_BITS = {name: 1 << i for i, name in enumerate(VALUES)}
+CODES = {field: {name: i + 1 for i, name in enumerate(names)} for field, names in VOCABULARIES.items()}
+CODES_VERSION = hashlib.sha1(repr((VALUES, VOCABULARIES)).encode()).hexdigest()[:8]
+
+# Readable fields whose change requires re-encoding
+ENCODED_FIELDS = ("values", *VOCABULARIES)
+
+
+def values_mask(values) -> int:
+    """Bitmask of the known values in ``values``; unknown values are ignored"""
+    mask = 0
+    for value in values or ():
+        mask |= VALUE_BITS.get(value, 0)
+    return mask
+
+
+def mask_values(mask: int) -> list:
+    """Names of the values set in ``mask``, in vocabulary order"""
+    return [name for name, bit in VALUE_BITS.items() if mask & bit]
+
+
+def encode_field(field: str, value):
+    if field == "values":
+        return Int64(values_mask(value))
+    return CODES[field].get(value, 0) if isinstance(value, str) else 0
+
+
+def encode_profile(user: dict) -> dict:
+    """The ``covenantCodes`` document for a user"""
+    codes = {field: encode_field(field, user.get(field)) for field in ENCODED_FIELDS}
+    codes["v"] = CODES_VERSION
+    return codes
+
+
+def encoded_update(update: dict) -> dict:
+    """Dotted ``$set`` entries re-encoding only the fields present in ``update``"""
+    changed = {f"covenantCodes.{field}": encode_field(field, update[field])
+               for field in ENCODED_FIELDS if field in update}
+    if changed:
+        changed["covenantCodes.v"] = CODES_VERSION
+    return changed
+
+
+async def backfill(users, batch_size: int = 1000, log=None) -> int:
+    """Encode every user whose codes are missing or from an older vocabulary.
+
+    Walks the collection in _id order so a document that fails to update is
+    never picked up again by the same run. Returns the number updated.
+    """
+    projection = {field: 1 for field in ENCODED_FIELDS}
+    query = {"covenantCodes.v": {"$ne": CODES_VERSION}}
+    updated = 0
+    last_id = None
+    while True:
+        page_query = {**query, "_id": {"$gt": last_id}} if last_id is not None else query
+        docs = await users.find(page_query, projection).sort("_id", 1).limit(batch_size).to_list(batch_size)
+        if not docs:
+            return updated
+        result = await users.bulk_write(
+            [UpdateOne({"_id": doc["_id"]}, {"$set": {"covenantCodes": encode_profile(doc)}}) for doc in docs],
+            ordered=False,
+        )
+        updated += result.modified_count
+        last_id = docs[-1]["_id"]
+        if log:
+            log(f"encoded: {updated:,}")
+
+
+async def _main():
+    from dotenv import load_dotenv
+    from motor.motor_asyncio import AsyncIOMotorClient
+
+    load_dotenv()
+    parser = argparse.ArgumentParser(description="Encode covenant scoring fields on user documents")
+    parser.add_argument("--backfill", action="store_true", required=True,
+                        help="encode users with missing or outdated covenantCodes")
+    parser.add_argument("--batch-size", type=int, default=1000)
+    args = parser.parse_args()
+
+    client = AsyncIOMotorClient(os.environ.get("MONGO_URL"))
+    db = client[os.environ.get("DB_NAME", "virgins_db")]
+    started = time.perf_counter()
+    updated = await backfill(db["users"], args.batch_size, log=lambda line: print(" ", line))
+    print(f"encoded {updated:,} users with codes version {CODES_VERSION} "
+          f"in {time.perf_counter() - started:.1f} s")
+
+
+if __name__ == "__main__":
+    asyncio.run(_main())
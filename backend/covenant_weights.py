@@ -0,0 +1,175 @@
+"""Named covenant weight profiles, compiled into lookup tables.
+
+A profile is a document in the ``weight_profiles`` collection:
+
+    {"_id": "values-heavy", "share": 10, "weights": {"values": 40, "lifestyleDefault": 0}}
+
+``weights`` overrides any subset of DEFAULT_WEIGHTS. ``share`` is the percent
+of users assigned to the profile; users are bucketed by a hash of their uid,
+so each one sees the same profile on every request and worker. Users outside
+every share get ``default``, whose weights can be overridden by storing a
+profile with that name.
+
+Profiles are compiled once per load into points tables indexed by the
+covenantCodes of covenant_codes.py, so scoring with an experiment profile
+costs the same as scoring with the defaults. ``WeightProfiles`` reloads the
+collection in the background, so edits apply without a restart.
+"""
+import hashlib
+import logging
+
+import numpy as np
+
+from background import PeriodicTask
+from covenant_codes import VOCABULARIES
+
+logger = logging.getLogger("virgins.weights")
+
+DEFAULT_PROFILE = "default"
+
+DEFAULT_WEIGHTS = {
+    # Faith (35 max): faith level plus denomination match, or being Christian
+    "faithLevel": {"Very Serious": 15, "Practicing": 10, "Cultural": 5},
+    "faithLevelDefault": 0,
+    "denominationMatch": 20,
+    "christian": 10,
+    # Values (30 max): share of the viewer's values the candidate holds
+    "values": 30,
+    "noValues": 15,
+    # Intention (25 max) and lifestyle (10 max)
+    "intention": {"Marriage ASAP": 25, "Marriage in 1-2 years": 20, "Dating to Marry": 15, "Unsure": 5},
+    "intentionDefault": 10,
+    "lifestyle": {"Traditional": 10, "Moderate": 5, "Modern": 3},
+    "lifestyleDefault": 3,
+}
+POINTS_FIELDS = ("faithLevel", "intention", "lifestyle")
+
+
+def _points(value, name):
+    if isinstance(value, bool) or not isinstance(value, int) or not 0 <= value <= 100:
+        raise ValueError(f"{name} must be an integer between 0 and 100")
+    return value
+
+
+class CompiledWeights:
+    """A weight profile flattened for the scorers.
+
+    ``tables[field]`` is a NumPy array of points indexed by the field's
+    covenant code (0 is the field's default), and ``pipeline_tables`` the
+    same as plain lists for $arrayElemAt.
+    """
+
+    def __init__(self, name: str, weights: dict):
+        self.name = name
+        self.weights = weights
+        self.points = {field: weights[field] for field in POINTS_FIELDS}
+        self.defaults = {field: weights[f"{field}Default"] for field in POINTS_FIELDS}
+        self.tables = {
+            field: np.array(
+                [self.defaults[field], *(self.points[field].get(v, self.defaults[field]) for v in VOCABULARIES[field])],
+                dtype=np.int64,
+            )
+            for field in POINTS_FIELDS
+        }
+        self.pipeline_tables = {field: table.tolist() for field, table in self.tables.items()}
+        self.denomination_match = weights["denominationMatch"]
+        self.christian = weights["christian"]
+        self.values = weights["values"]
+        self.no_values = weights["noValues"]
+
+
+def compile_weights(name: str, overrides: dict = None) -> CompiledWeights:
+    """Merge ``overrides`` over DEFAULT_WEIGHTS, validate and compile. Raises ValueError."""
+    overrides = overrides or {}
+    if not isinstance(overrides, dict):
+        raise ValueError("weights must be an object")
+    unknown = set(overrides) - set(DEFAULT_WEIGHTS)
+    if unknown:
+        raise ValueError(f"Unknown weights: {', '.join(sorted(unknown))}")
+    weights = {}
+    for key, default in DEFAULT_WEIGHTS.items():
+        value = overrides.get(key, default)
+        if isinstance(default, dict):
+            if not isinstance(value, dict):
+                raise ValueError(f"{key} must map {key} values to points")
+            extra = set(value) - set(VOCABULARIES[key])
+            if extra:
+                raise ValueError(f"Unknown {key} values: {', '.join(sorted(extra))}")
+            value = {option: _points(points, f"{key}.{option}") for option, points in value.items()}
+        else:
+            value = _points(value, key)
+        weights[key] = value
+    return CompiledWeights(name, weights)
+
+
+DEFAULT_COMPILED = compile_weights(DEFAULT_PROFILE)
+
+
+def assignment_bucket(uid: str, salt: str = "") -> int:
+    """Stable bucket in [0, 100) for a user"""
+    digest = hashlib.blake2b(f"{salt}:{uid}".encode(), digest_size=8).digest()
+    return int.from_bytes(digest, "little") % 100
+
+
+class WeightProfiles(PeriodicTask):
+    """Compiled weight profiles and the bucket ranges assigned to them.
+
+    ``for_user`` is a dictionary lookup plus one hash. ``reload`` swaps in
+    a new set atomically; a profile that fails to compile is logged and
+    skipped, leaving the rest in service.
+    """
+
+    def __init__(self, collection, interval: float, salt: str = ""):
+        super().__init__(interval)
+        self.collection = collection
+        self.salt = salt
+        self.profiles = {DEFAULT_PROFILE: DEFAULT_COMPILED}
+        self.ranges = []
+
+    def for_user(self, uid: str) -> CompiledWeights:
+        if self.ranges:
+            bucket = assignment_bucket(uid, self.salt)
+            for upper, profile in self.ranges:
+                if bucket < upper:
+                    return profile
+        return self.profiles[DEFAULT_PROFILE]
+
+    async def reload(self):
+        docs = await self.collection.find({}).sort("_id", 1).to_list(None)
+        profiles = {DEFAULT_PROFILE: DEFAULT_COMPILED}
+        ranges = []
+        allocated = 0
+        for doc in docs:
+            name = doc["_id"]
+            try:
+                profile = compile_weights(name, doc.get("weights"))
+                share = _points(doc.get("share", 0), "share")
+            except ValueError as e:
+                logger.error("Skipping weight profile %s: %s", name, e)
+                continue
+            profiles[name] = profile
+            if name != DEFAULT_PROFILE and share > 0:
+                if allocated + share > 100:
+                    logger.error("Weight profile %s not assigned: shares exceed 100%%", name)
+                    continue
+                allocated += share
+                ranges.append((allocated, profile))
+        self.profiles, self.ranges = profiles, ranges
+
+    def summary(self) -> list:
+        shares = {}
+        lower = 0
+        for upper, profile in self.ranges:
+            shares[profile.name] = upper - lower
+            lower = upper
+        shares[DEFAULT_PROFILE] = 100 - lower
+        return [
+            {"name": name, "share": shares.get(name, 0), "weights": profile.weights}
+            for name, profile in self.profiles.items()
+        ]
+
+    async def tick(self):
+        try:
+            await self.reload()
+        except Exception:
+            logger.exception("Failed to reload weight profiles; keeping the current set")
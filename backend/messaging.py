@@ -0,0 +1,150 @@
+"""Real-time delivery for match conversations.
+
+* ``Broker`` - publish/subscribe interface between message producers and the
+  sockets connected to this worker. ``InProcessBroker`` fans out inside one
+  process; a Redis or NATS implementation can replace it for multi-worker
+  deployments without touching the endpoints.
+* ``Connection`` - one WebSocket with a bounded outgoing queue, so a slow
+  client can never block the publisher or grow memory without limit.
+* ``LastMessageWriter`` - coalesces ``lastMessage`` updates per match and
+  writes them in one ``bulk_write`` per interval instead of once per message.
+"""
+import asyncio
+import logging
+from abc import ABC, abstractmethod
+from collections import defaultdict
+
+from bson import ObjectId
+from pymongo import UpdateOne
+
+from background import PeriodicTask
+
+logger = logging.getLogger("virgins.messaging")
+
+# Close code sent to clients that fell too far behind; they reconnect and
+# page the missed messages from the history endpoint.
+CLOSE_SLOW_CONSUMER = 4008
+
+
+class Broker(ABC):
+    """Channel-based fan-out. Payloads are pre-serialized text frames."""
+
+    @abstractmethod
+    def subscribe(self, channel: str, connection):
+        ...
+
+    @abstractmethod
+    def unsubscribe(self, channel: str, connection):
+        ...
+
+    @abstractmethod
+    async def publish(self, channel: str, payload: str, droppable: bool = False):
+        ...
+
+    @abstractmethod
+    def connection_count(self) -> int:
+        ...
+
+
+class InProcessBroker(Broker):
+    """Delivers to the sockets connected to this process only"""
+
+    def __init__(self):
+        self.channels = defaultdict(set)
+
+    def subscribe(self, channel, connection):
+        self.channels[channel].add(connection)
+
+    def unsubscribe(self, channel, connection):
+        subscribers = self.channels.get(channel)
+        if subscribers is not None:
+            subscribers.discard(connection)
+            if not subscribers:
+                del self.channels[channel]
+
+    async def publish(self, channel, payload, droppable=False):
+        for connection in list(self.channels.get(channel, ())):
+            connection.deliver(payload, droppable)
+
+    def connection_count(self):
+        return sum(len(subscribers) for subscribers in self.channels.values())
+
+
+class Connection:
+    """A subscribed WebSocket and its bounded send queue.
+
+    ``deliver`` never blocks. When the queue is full, droppable frames
+    (typing indicators) are discarded. Any other frame marks the connection
+    as overflowed, and the sender closes it.
+    """
+
+    def __init__(self, websocket, uid: str, queue_size: int):
+        self.websocket = websocket
+        self.uid = uid
+        self.queue = asyncio.Queue(maxsize=queue_size)
+        self.overflowed = False
+
+    def deliver(self, payload: str, droppable: bool = False):
+        if self.overflowed:
+            return
+        try:
+            self.queue.put_nowait(payload)
+        except asyncio.QueueFull:
+            if not droppable:
+                self.overflowed = True
+
+    async def sender(self):
+        try:
+            while True:
+                if self.overflowed and self.queue.empty():
+                    await self.websocket.close(code=CLOSE_SLOW_CONSUMER)
+                    return
+                payload = await self.queue.get()
+                await self.websocket.send_text(payload)
+        except Exception:
+            # The client went away; the receive loop handles the cleanup
+            return
+
+
+class LastMessageWriter(PeriodicTask):
+    """Batches the match preview (lastMessage/lastMessageAt/lastActivityAt).
+
+    Only the newest message per match is kept between flushes, and the
+    update is guarded on lastMessageAt so an older batch from another worker
+    can never overwrite a newer preview.
+    """
+
+    def __init__(self, collection, interval: float):
+        super().__init__(interval)
+        self.collection = collection
+        self.pending = {}
+
+    def record(self, match_id: str, text: str, at: str):
+        current = self.pending.get(match_id)
+        if current is None or current[1] <= at:
+            self.pending[match_id] = (text, at)
+
+    async def flush(self):
+        pending, self.pending = self.pending, {}
+        if not pending:
+            return
+        ops = [
+            UpdateOne(
+                {"_id": ObjectId(match_id), "$or": [{"lastMessageAt": None}, {"lastMessageAt": {"$lt": at}}]},
+                {"$set": {"lastMessage": text, "lastMessageAt": at, "lastActivityAt": at}},
+            )
+            for match_id, (text, at) in pending.items()
+        ]
+        try:
+            await self.collection.bulk_write(ops, ordered=False)
+        except Exception:
+            logger.exception("Failed to write %d match previews; retrying on the next interval", len(ops))
+            for match_id, (text, at) in pending.items():
+                self.record(match_id, text, at)
+
+    async def tick(self):
+        await self.flush()
+
+    async def stop(self):
+        await super().stop()
+        await self.flush()
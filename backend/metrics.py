@@ -0,0 +1,241 @@
+"""In-process metrics with Prometheus text exposition.
+
+Three pieces feed one registry:
+
+* ``MetricsMiddleware`` - ASGI middleware timing every HTTP request by route
+  template, method and status, plus in-flight request gauges
+* ``MongoCommandListener`` - pymongo command listener timing every MongoDB
+  command by collection and operation, logging slow commands
+* ``registry.render()`` - the Prometheus text format served at ``/metrics``
+
+Together they show whether a slow endpoint is spending its time in Python or
+waiting on MongoDB.
+"""
+import logging
+import os
+import threading
+import time
+from bisect import bisect_left
+from collections import defaultdict
+
+from pymongo import monitoring
+from starlette.routing import Match
+
+logger = logging.getLogger("virgins.metrics")
+
+MONGO_SLOW_COMMAND_MS = float(os.environ.get("MONGO_SLOW_COMMAND_MS", "100"))
+
+# Seconds; roughly log-spaced from sub-millisecond Mongo reads to slow LLM calls
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names, values, extra=None) -> str:
+    pairs = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class Histogram:
+    def __init__(self, name, help_text, label_names, buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.help = help_text
+        self.label_names = tuple(label_names)
+        self.buckets = tuple(buckets)
+        self.series = {}
+        self.lock = threading.Lock()
+
+    def observe(self, labels, value):
+        with self.lock:
+            series = self.series.get(labels)
+            if series is None:
+                series = self.series[labels] = [[0] * len(self.buckets), 0.0, 0]
+            index = bisect_left(self.buckets, value)
+            if index < len(self.buckets):
+                series[0][index] += 1
+            series[1] += value
+            series[2] += 1
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        with self.lock:
+            snapshot = [(labels, list(s[0]), s[1], s[2]) for labels, s in self.series.items()]
+        for labels, counts, total, count in sorted(snapshot):
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets, counts):
+                cumulative += bucket_count
+                label_str = _format_labels(self.label_names, labels, f'le="{bound}"')
+                lines.append(f"{self.name}_bucket{label_str} {cumulative}")
+            label_str = _format_labels(self.label_names, labels, 'le="+Inf"')
+            lines.append(f"{self.name}_bucket{label_str} {count}")
+            plain = _format_labels(self.label_names, labels)
+            lines.append(f"{self.name}_sum{plain} {total}")
+            lines.append(f"{self.name}_count{plain} {count}")
+        return lines
+
+
+class Counter:
+    def __init__(self, name, help_text, label_names, kind="counter"):
+        self.name = name
+        self.help = help_text
+        self.label_names = tuple(label_names)
+        self.kind = kind
+        self.values = defaultdict(float)
+        self.lock = threading.Lock()
+
+    def inc(self, labels, amount=1):
+        with self.lock:
+            self.values[labels] += amount
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+        with self.lock:
+            snapshot = sorted(self.values.items())
+        for labels, value in snapshot:
+            lines.append(f"{self.name}{_format_labels(self.label_names, labels)} {value:g}")
+        return lines
+
+
+def Gauge(name, help_text, label_names):
+    return Counter(name, help_text, label_names, kind="gauge")
+
+
+class Registry:
+    def __init__(self):
+        self.metrics = []
+        self.callbacks = []
+
+    def add(self, metric):
+        self.metrics.append(metric)
+        return metric
+
+    def gauge_callback(self, name, help_text, fn):
+        """Register a gauge whose value is read from ``fn()`` at scrape time"""
+        self.callbacks.append((name, help_text, fn))
+
+    def render(self) -> str:
+        lines = []
+        for metric in self.metrics:
+            lines.extend(metric.render())
+        for name, help_text, fn in self.callbacks:
+            try:
+                value = fn()
+            except Exception:
+                logger.exception("Metrics callback %s failed", name)
+                continue
+            lines += [f"# HELP {name} {help_text}", f"# TYPE {name} gauge", f"{name} {value:g}"]
+        return "\n".join(lines) + "\n"
+
+
+registry = Registry()
+
+http_request_duration = registry.add(Histogram(
+    "http_request_duration_seconds", "HTTP request latency by route template.",
+    ("method", "route", "status"),
+))
+http_requests_in_flight = registry.add(Gauge(
+    "http_requests_in_flight", "HTTP requests currently being handled.", ("method", "route"),
+))
+mongo_command_duration = registry.add(Histogram(
+    "mongo_command_duration_seconds", "MongoDB command latency by collection and operation.",
+    ("collection", "command"),
+))
+mongo_command_failures = registry.add(Counter(
+    "mongo_command_failures_total", "Failed MongoDB commands.", ("collection", "command"),
+))
+mongo_slow_commands = registry.add(Counter(
+    "mongo_slow_commands_total", f"MongoDB commands slower than {MONGO_SLOW_COMMAND_MS:g} ms.",
+    ("collection", "command"),
+))
+
+
+class MetricsMiddleware:
+    """Pure ASGI middleware recording per-route latency and in-flight requests.
+
+    Routes are labelled by their path template (``/api/users/{firebase_uid}``)
+    so per-user URLs don't explode the number of series; requests matching
+    no route are grouped under ``unmatched``.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    @staticmethod
+    def _route_template(scope):
+        app = scope.get("app")
+        for route in getattr(app, "routes", []):
+            match, _ = route.matches(scope)
+            if match != Match.NONE:
+                return route.path
+        return "unmatched"
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        method = scope["method"]
+        route = self._route_template(scope)
+        status = {"code": 500}
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                status["code"] = message["status"]
+            await send(message)
+
+        http_requests_in_flight.inc((method, route))
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            http_request_duration.observe((method, route, str(status["code"])), time.perf_counter() - start)
+            http_requests_in_flight.inc((method, route), -1)
+
+
+class MongoCommandListener(monitoring.CommandListener):
+    """Times MongoDB commands per collection/operation and logs slow ones.
+
+    The collection name is only present on the started event, so it is kept
+    per in-flight request id until the matching succeeded/failed event.
+    """
+
+    def __init__(self, slow_ms=MONGO_SLOW_COMMAND_MS):
+        self.slow_seconds = slow_ms / 1000
+        self.pending = {}
+        self.lock = threading.Lock()
+
+    def started(self, event):
+        # getMore carries the cursor id under its name and the collection separately
+        key = "collection" if event.command_name == "getMore" else event.command_name
+        collection = event.command.get(key)
+        if not isinstance(collection, str):
+            collection = ""
+        with self.lock:
+            self.pending[(event.connection_id, event.request_id)] = collection
+
+    def _finish(self, event):
+        with self.lock:
+            collection = self.pending.pop((event.connection_id, event.request_id), "")
+        labels = (collection, event.command_name)
+        seconds = event.duration_micros / 1_000_000
+        mongo_command_duration.observe(labels, seconds)
+        if seconds >= self.slow_seconds:
+            mongo_slow_commands.inc(labels)
+            logger.warning(
+                "Slow MongoDB command: %s on %s took %.1f ms",
+                event.command_name, collection or "<admin>", seconds * 1000,
+            )
+        return labels
+
+    def succeeded(self, event):
+        self._finish(event)
+
+    def failed(self, event):
+        mongo_command_failures.inc(self._finish(event))
+
+
+mongo_listener = MongoCommandListener()
@@ -0,0 +1,263 @@
+"""Synthetic population generator for load and ranking tests.
+
+Generates realistic-looking users clustered around real US cities, plus likes
+and matches between them, and bulk-loads everything with unordered
+``insert_many`` batches. Documents are produced lazily so populations of
+millions never have to fit in memory.
+
+Usable from the admin API (``POST /api/admin/seed/synthetic``) or directly:
+
+    python backend/seeding.py --users 1000000 --likes-per-user 8 --match-rate 0.15
+"""
+import argparse
+import asyncio
+import os
+import random
+import time
+from datetime import datetime, timedelta, timezone
+
+from pymongo.errors import BulkWriteError
+
+from covenant_codes import encode_profile
+
+SYNTHETIC_PREFIX = "synth_"
+
+# (location label, longitude, latitude, relative population weight)
+CITIES = [
+    ("Dallas, TX", -96.7970, 32.7767, 9),
+    ("Houston, TX", -95.3698, 29.7604, 10),
+    ("Austin, TX", -97.7431, 30.2672, 7),
+    ("San Antonio, TX", -98.4936, 29.4241, 6),
+    ("Nashville, TN", -86.7816, 36.1627, 6),
+    ("Atlanta, GA", -84.3880, 33.7490, 8),
+    ("Charlotte, NC", -80.8431, 35.2271, 6),
+    ("Raleigh, NC", -78.6382, 35.7796, 4),
+    ("Birmingham, AL", -86.8025, 33.5186, 3),
+    ("Oklahoma City, OK", -97.5164, 35.4676, 3),
+    ("Colorado Springs, CO", -104.8214, 38.8339, 3),
+    ("Phoenix, AZ", -112.0740, 33.4484, 7),
+    ("Orlando, FL", -81.3792, 28.5383, 5),
+    ("Jacksonville, FL", -81.6557, 30.3322, 4),
+    ("Columbus, OH", -82.9988, 39.9612, 4),
+    ("Indianapolis, IN", -86.1581, 39.7684, 4),
+    ("Grand Rapids, MI", -85.6681, 42.9634, 2),
+    ("Los Angeles, CA", -118.2437, 34.0522, 8),
+    ("Chicago, IL", -87.6298, 41.8781, 7),
+    ("New York, NY", -74.0060, 40.7128, 8),
+]
+
+DENOMINATIONS = {
+    "Non-Denominational": 24, "Baptist": 20, "Catholic": 18, "Methodist": 8,
+    "Presbyterian": 6, "Pentecostal": 7, "Lutheran": 5, "Reformed": 4,
+    "Orthodox": 3, "Anglican": 3, "Other": 2,
+}
+FAITH_LEVELS = {"Very Serious": 40, "Practicing": 40, "Cultural": 12, "Exploring": 8}
+INTENTIONS = {"Marriage ASAP": 30, "Marriage in 1-2 years": 35, "Dating to Marry": 28, "Unsure": 7}
+LIFESTYLES = {"Traditional": 45, "Moderate": 40, "Modern": 15}
+VALUES = {
+    "Family": 30, "Purity": 25, "Faith": 22, "Kindness": 18, "Tradition": 15,
+    "Leadership": 10, "Education": 10, "Pro-Life": 9, "Homeschooling": 6,
+    "Career": 8, "Travel": 8, "Music": 7, "Sports": 6, "Service": 9, "Missions": 5,
+}
+
+FEMALE_NAMES = [
+    "Abigail", "Anna", "Bethany", "Chloe", "Deborah", "Eden", "Elizabeth", "Esther",
+    "Faith", "Grace", "Hannah", "Hope", "Joy", "Leah", "Lydia", "Mary", "Miriam",
+    "Naomi", "Olivia", "Priscilla", "Rachel", "Rebecca", "Ruth", "Sarah", "Victoria",
+]
+MALE_NAMES = [
+    "Aaron", "Andrew", "Benjamin", "Caleb", "Daniel", "David", "Elijah", "Ethan",
+    "Gabriel", "Isaac", "Jacob", "James", "Joel", "John", "Jonah", "Joseph", "Joshua",
+    "Levi", "Luke", "Matthew", "Micah", "Nathan", "Noah", "Paul", "Samuel", "Timothy",
+]
+BIO_OPENERS = [
+    "Saving myself for marriage.", "Faith comes first in everything I do.",
+    "Serving at my church every Sunday.", "Small-town heart, big faith.",
+    "Trying to walk with God daily.", "Grateful for every blessing.",
+]
+BIO_CLOSERS = [
+    "Looking for a spouse to build a Christ-centered home with.",
+    "Hoping to meet someone who shares my values.",
+    "Ready for a courtship that honors God.",
+    "Seeking a partner in faith and in life.",
+]
+
+
+def _weighted(rng, table):
+    return rng.choices(list(table), weights=list(table.values()), k=1)[0]
+
+
+def _gender(index):
+    # Gender follows index parity so likes can target the opposite gender
+    # without keeping the population in memory.
+    return "Female" if index % 2 == 0 else "Male"
+
+
+def synthetic_uid(index, prefix=SYNTHETIC_PREFIX):
+    return f"{prefix}{index:08d}"
+
+
+def generate_user(index, rng, now, prefix=SYNTHETIC_PREFIX):
+    gender = _gender(index)
+    name = rng.choice(FEMALE_NAMES if gender == "Female" else MALE_NAMES)
+    location, lng, lat, _ = rng.choices(CITIES, weights=[c[3] for c in CITIES], k=1)[0]
+    denomination = _weighted(rng, DENOMINATIONS)
+    values = set()
+    value_count = rng.randint(2, 4)
+    while len(values) < value_count:
+        values.add(_weighted(rng, VALUES))
+
+    user = {
+        "firebaseUid": synthetic_uid(index, prefix),
+        "email": f"{prefix}{index}@synthetic.local",
+        "name": name,
+        "age": max(18, min(45, int(rng.triangular(18, 40, 25)))),
+        "gender": gender,
+        "location": location,
+        # Metro-sized spread around the city centre
+        "coordinates": {"type": "Point", "coordinates": [
+            round(lng + rng.gauss(0, 0.12), 5),
+            round(lat + rng.gauss(0, 0.10), 5),
+        ]},
+        "faith": "Catholic" if denomination == "Catholic" else "Christian",
+        "faithLevel": _weighted(rng, FAITH_LEVELS),
+        "denomination": denomination,
+        "values": sorted(values),
+        "intention": _weighted(rng, INTENTIONS),
+        "lifestyle": _weighted(rng, LIFESTYLES),
+        "bio": f"{rng.choice(BIO_OPENERS)} {rng.choice(BIO_CLOSERS)}",
+        "photos": [],
+        "profileImage": "",
+        "status": "verified" if rng.random() < 0.7 else "pending",
+        "isPremium": rng.random() < 0.15,
+        "createdAt": (now - timedelta(minutes=rng.randint(0, 180 * 24 * 60))).isoformat(),
+    }
+    user["covenantCodes"] = encode_profile(user)
+    return user
+
+
+def generate_interactions(users, likes_per_user, match_rate, rng, now, prefix=SYNTHETIC_PREFIX):
+    """Yield ("like", doc) and ("match", doc) pairs between opposite-gender users"""
+    if users < 2:
+        return
+    for index in range(users):
+        uid = synthetic_uid(index, prefix)
+        for _ in range(rng.randint(0, 2 * likes_per_user)):
+            # Any index of the opposite parity is someone of the other gender
+            target = rng.randrange(1 - index % 2, users, 2)
+            other = synthetic_uid(target, prefix)
+            created = (now - timedelta(minutes=rng.randint(0, 30 * 24 * 60))).isoformat()
+            if rng.random() < match_rate:
+                pair = sorted([uid, other])
+                yield "match", {
+                    "users": pair,
+                    "pairKey": "|".join(pair),
+                    "createdAt": created,
+                    "lastMessage": None,
+                    "lastMessageAt": None,
+                    "lastActivityAt": created,
+                }
+            else:
+                yield "like", {"fromUserId": uid, "toUserId": other, "createdAt": created}
+
+
+async def _insert_batch(collection, docs):
+    """Unordered bulk insert; duplicates are skipped rather than aborting the batch"""
+    try:
+        result = await collection.insert_many(docs, ordered=False)
+        return len(result.inserted_ids)
+    except BulkWriteError as e:
+        return e.details.get("nInserted", 0)
+
+
+async def seed_population(db, users=10000, likes_per_user=5, match_rate=0.15,
+                          batch_size=5000, seed=None, prefix=SYNTHETIC_PREFIX, log=None):
+    """Generate and bulk-load a synthetic population; returns a throughput report"""
+    rng = random.Random(seed)
+    now = datetime.now(timezone.utc)
+    inserted = {"users": 0, "likes": 0, "matches": 0}
+    started = time.perf_counter()
+
+    batch = []
+    for index in range(users):
+        batch.append(generate_user(index, rng, now, prefix))
+        if len(batch) >= batch_size:
+            inserted["users"] += await _insert_batch(db["users"], batch)
+            batch = []
+            if log:
+                log(f"users: {inserted['users']:,}")
+    if batch:
+        inserted["users"] += await _insert_batch(db["users"], batch)
+    users_done = time.perf_counter()
+
+    batches = {"like": [], "match": []}
+    collections = {"like": (db["likes"], "likes"), "match": (db["matches"], "matches")}
+    for kind, doc in generate_interactions(users, likes_per_user, match_rate, rng, now, prefix):
+        batches[kind].append(doc)
+        if len(batches[kind]) >= batch_size:
+            collection, key = collections[kind]
+            inserted[key] += await _insert_batch(collection, batches[kind])
+            batches[kind] = []
+            if log:
+                log(f"likes: {inserted['likes']:,}  matches: {inserted['matches']:,}")
+    for kind, docs in batches.items():
+        if docs:
+            collection, key = collections[kind]
+            inserted[key] += await _insert_batch(collection, docs)
+    finished = time.perf_counter()
+
+    total_seconds = finished - started
+    interaction_seconds = finished - users_done
+    return {
+        **inserted,
+        "seconds": round(total_seconds, 2),
+        "usersPerSecond": round(inserted["users"] / max(users_done - started, 1e-9)),
+        "interactionsPerSecond": round((inserted["likes"] + inserted["matches"]) / max(interaction_seconds, 1e-9)),
+        "docsPerSecond": round(sum(inserted.values()) / max(total_seconds, 1e-9)),
+    }
+
+
+async def clear_population(db, prefix=SYNTHETIC_PREFIX):
+    pattern = {"$regex": f"^{prefix}"}
+    users = await db["users"].delete_many({"firebaseUid": pattern})
+    likes = await db["likes"].delete_many({"fromUserId": pattern})
+    matches = await db["matches"].delete_many({"users": pattern})
+    return {"users": users.deleted_count, "likes": likes.deleted_count, "matches": matches.deleted_count}
+
+
+async def adjust_stats_totals(db, delta):
+    """Apply a users/likes/matches delta to the admin stats totals document"""
+    await db["stats"].update_one({"_id": "totals"}, {"$inc": delta}, upsert=True)
+
+
+async def _main():
+    from dotenv import load_dotenv
+    from motor.motor_asyncio import AsyncIOMotorClient
+
+    load_dotenv()
+    parser = argparse.ArgumentParser(description="Bulk-load a synthetic VIRGINS population")
+    parser.add_argument("--users", type=int, default=10000)
+    parser.add_argument("--likes-per-user", type=int, default=5)
+    parser.add_argument("--match-rate", type=float, default=0.15)
+    parser.add_argument("--batch-size", type=int, default=5000)
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--prefix", default=SYNTHETIC_PREFIX)
+    parser.add_argument("--clear", action="store_true", help="remove the existing synthetic population first")
+    args = parser.parse_args()
+
+    client = AsyncIOMotorClient(os.environ.get("MONGO_URL"))
+    db = client[os.environ.get("DB_NAME", "virgins_db")]
+    if args.clear:
+        cleared = await clear_population(db, args.prefix)
+        await adjust_stats_totals(db, {k: -v for k, v in cleared.items()})
+        print("cleared:", cleared)
+    report = await seed_population(
+        db, args.users, args.likes_per_user, args.match_rate, args.batch_size,
+        args.seed, args.prefix, log=lambda line: print(" ", line),
+    )
+    await adjust_stats_totals(db, {k: report[k] for k in ("users", "likes", "matches")})
+    print("seeded:", report)
+
+
+if __name__ == "__main__":
+    asyncio.run(_main())
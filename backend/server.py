@@ -1,34 +1,113 @@
-from fastapi import FastAPI, HTTPException, Header, Request, Query
+import time
+
+# Start of the startup-time report; taken before the framework imports
+_process_started = time.perf_counter()
+
+from fastapi import FastAPI, HTTPException, Header, Request, Query, Response, WebSocket, WebSocketDisconnect
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import ORJSONResponse, PlainTextResponse, StreamingResponse
 from motor.motor_asyncio import AsyncIOMotorClient
 from contextlib import asynccontextmanager
 from dotenv import load_dotenv
-from datetime import datetime, timezone
-from bson import ObjectId
-from emergentintegrations.llm.chat import LlmChat, UserMessage
-from passlib.context import CryptContext
-from math import radians, sin, cos, sqrt, atan2
+from datetime import datetime, timedelta, timezone
+from bson import Int64, ObjectId
+from bson.errors import InvalidId
+from pymongo import ReturnDocument, UpdateOne
+from pymongo.errors import BulkWriteError, DuplicateKeyError
+from collections import OrderedDict, defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional
+import asyncio
+import base64
+import json
+import logging
+import hashlib
+import math
 import jwt
+import numpy as np
 import os
+import sys
 import uuid
-import httpx
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+from background import BackgroundTask, PeriodicTask, QueueWorker
+from bio_index import BioIndex
+from covenant_codes import (
+    CODES, CODES_VERSION, VALUE_BITS, backfill as backfill_covenant_codes,
+    encode_field, encode_profile, encoded_update, mask_values, values_mask,
+)
+from covenant_weights import DEFAULT_COMPILED, DEFAULT_PROFILE, CompiledWeights, WeightProfiles, compile_weights
+from messaging import Connection, InProcessBroker, LastMessageWriter
+from metrics import MetricsMiddleware, mongo_listener, registry as metrics_registry
+from seeding import SYNTHETIC_PREFIX, clear_population, seed_population
+
+logger = logging.getLogger("virgins")
+
 JWT_SECRET = os.environ.get("JWT_SECRET", "virgins-app-secret-key-2024")
 
 load_dotenv()
 
+# Changing BCRYPT_ROUNDS rehashes existing passwords on their next login
+BCRYPT_ROUNDS = int(os.environ.get("BCRYPT_ROUNDS", "12"))
+PASSWORD_HASH_WORKERS = int(os.environ.get("PASSWORD_HASH_WORKERS", "4"))
+PASSWORD_HASH_MAX_QUEUE = int(os.environ.get("PASSWORD_HASH_MAX_QUEUE", "256"))
+
+_pwd_context = None
+
+
+def get_pwd_context():
+    """passlib/bcrypt are only imported once a password is first hashed or checked"""
+    global _pwd_context
+    if _pwd_context is None:
+        from passlib.context import CryptContext
+
+        _pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto", bcrypt__rounds=BCRYPT_ROUNDS)
+    return _pwd_context
+
 MONGO_URL = os.environ.get("MONGO_URL")
 DB_NAME = os.environ.get("DB_NAME", "virgins_db")
 EMERGENT_LLM_KEY = os.environ.get("EMERGENT_LLM_KEY")
 GOOGLE_MAPS_API_KEY = os.environ.get("GOOGLE_MAPS_API_KEY", "")
+GOOGLE_PLACES_URL = os.environ.get("GOOGLE_PLACES_URL", "https://places.googleapis.com/v1/places:searchNearby")
 
-client = AsyncIOMotorClient(MONGO_URL)
+client = AsyncIOMotorClient(MONGO_URL, event_listeners=[mongo_listener])
 db = client[DB_NAME]
 
 users_col = db["users"]
 likes_col = db["likes"]
 matches_col = db["matches"]
+decks_col = db["discovery_decks"]
+stats_col = db["stats"]
+messages_col = db["messages"]
+deletion_jobs_col = db["deletion_jobs"]
+seen_col = db["seen_sets"]
+
+DISCOVER_DECK_SIZE = int(os.environ.get("DISCOVER_DECK_SIZE", "200"))
+# Seconds before a served deck is rebuilt so new and edited users can enter it
+DISCOVER_DECK_MAX_AGE = float(os.environ.get("DISCOVER_DECK_MAX_AGE", "900"))
+STATS_FLUSH_INTERVAL = float(os.environ.get("STATS_FLUSH_INTERVAL", "1.0"))
+MESSAGE_MAX_LENGTH = int(os.environ.get("MESSAGE_MAX_LENGTH", "2000"))
+MESSAGE_PREVIEW_FLUSH_INTERVAL = float(os.environ.get("MESSAGE_PREVIEW_FLUSH_INTERVAL", "1.0"))
+WEBSOCKET_QUEUE_SIZE = int(os.environ.get("WEBSOCKET_QUEUE_SIZE", "64"))
+DELETION_BATCH_SIZE = int(os.environ.get("DELETION_BATCH_SIZE", "500"))
+DELETION_BATCH_PAUSE = float(os.environ.get("DELETION_BATCH_PAUSE", "0.05"))
+DELETION_LEASE_SECONDS = float(os.environ.get("DELETION_LEASE_SECONDS", "60"))
+DELETION_POLL_INTERVAL = float(os.environ.get("DELETION_POLL_INTERVAL", "30"))
+
+# Seen-set Bloom filters grow in generations: the first holds SEEN_FILTER_CAPACITY
+# users, and each later one twice as many at half the false-positive rate, so
+# the rate stays under SEEN_FILTER_ERROR however many users have been seen.
+# At the defaults 1,000 seen users take ~2 KB of BSON, 10,000 ~50 KB and
+# 1,000,000 ~5.5 MB; the 16 MB document limit is reached near 2 million.
+SEEN_FILTER_CAPACITY = int(os.environ.get("SEEN_FILTER_CAPACITY", "1024"))
+SEEN_FILTER_ERROR = float(os.environ.get("SEEN_FILTER_ERROR", "0.01"))
+SEEN_CACHE_TTL = float(os.environ.get("SEEN_CACHE_TTL", "30"))
+SEEN_CACHE_SIZE = int(os.environ.get("SEEN_CACHE_SIZE", "10000"))
+# Extra rows discover may read past seen candidates before returning a short page
+SEEN_SCAN_LIMIT = int(os.environ.get("SEEN_SCAN_LIMIT", "1000"))
+SWIPE_SYNC_MAX_ITEMS = int(os.environ.get("SWIPE_SYNC_MAX_ITEMS", "500"))
+
+# Tombstoned accounts keep their document until the deletion job finishes
+NOT_DELETED = {"deletedAt": {"$exists": False}}
 
 MOCK_USERS = [
     {
@@ -207,19 +286,297 @@ def serialize_docs(docs):
     return [serialize_doc(d) for d in docs]
 
 
+def serialize_user(doc):
+    """A user document as returned to its owner, without credentials or internal scoring fields"""
+    user = serialize_doc(doc)
+    if user is not None:
+        user.pop("passwordHash", None)
+        user.pop("covenantCodes", None)
+    return user
+
+
+def encode_cursor(position: dict) -> str:
+    """Encode a keyset position as an opaque, URL-safe continuation token"""
+    raw = json.dumps(position, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(token: str) -> dict:
+    try:
+        padded = token + "=" * (-len(token) % 4)
+        position = json.loads(base64.urlsafe_b64decode(padded.encode()))
+    except (ValueError, UnicodeDecodeError):
+        raise HTTPException(400, "Invalid cursor")
+    if not isinstance(position, dict):
+        raise HTTPException(400, "Invalid cursor")
+    return position
+
+
+def keyset_after(field: str, cursor: Optional[str]) -> dict:
+    """Filter for rows after a (field desc, _id desc) keyset cursor"""
+    if not cursor:
+        return {}
+    position = decode_cursor(cursor)
+    try:
+        value, oid = position["k"], ObjectId(position["i"])
+    except (KeyError, TypeError, ValueError, InvalidId):
+        raise HTTPException(400, "Invalid cursor")
+    return {"$or": [{field: {"$lt": value}}, {field: value, "_id": {"$lt": oid}}]}
+
+
+async def fetch_keyset_page(collection, query: dict, field: str, limit: int, cursor: Optional[str], response: Response):
+    """Fetch one page ordered by (field desc, _id desc), setting X-Next-Cursor if more remain"""
+    after = keyset_after(field, cursor)
+    docs = await collection.find(
+        {"$and": [query, after]} if after else query
+    ).sort([(field, -1), ("_id", -1)]).limit(limit + 1).to_list(limit + 1)
+    if len(docs) > limit:
+        docs = docs[:limit]
+        last = docs[-1]
+        response.headers["X-Next-Cursor"] = encode_cursor({"k": last.get(field), "i": str(last["_id"])})
+    return docs
+
+
+class TTLCache:
+    """In-memory LRU cache with a per-entry TTL and request coalescing.
+
+    get_or_load() runs the loader once per key even when many requests miss
+    at the same time: later callers await the in-flight load instead of
+    issuing their own. Loader exceptions are shared by all waiters and are
+    not cached.
+    """
+
+    def __init__(self, max_entries: int, ttl: float):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.entries = OrderedDict()
+        self.in_flight = {}
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+
+    def get(self, key, default=None):
+        entry = self.entries.get(key)
+        if entry is None:
+            return default
+        expires_at, value = entry
+        if expires_at < time.monotonic():
+            del self.entries[key]
+            return default
+        self.entries.move_to_end(key)
+        return value
+
+    def set(self, key, value):
+        self.entries[key] = (time.monotonic() + self.ttl, value)
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+
+    def discard(self, key):
+        self.entries.pop(key, None)
+
+    async def get_or_load(self, key, loader):
+        missing = object()
+        value = self.get(key, missing)
+        if value is not missing:
+            self.hits += 1
+            return value
+
+        task = self.in_flight.get(key)
+        if task is not None:
+            self.coalesced += 1
+        else:
+            self.misses += 1
+            task = asyncio.ensure_future(loader())
+            self.in_flight[key] = task
+
+            def _finish(done, key=key):
+                self.in_flight.pop(key, None)
+                if not done.cancelled() and done.exception() is None:
+                    self.set(key, done.result())
+
+            task.add_done_callback(_finish)
+        # Shielded so one caller disconnecting doesn't cancel the load for the rest
+        return await asyncio.shield(task)
+
+    def stats(self) -> dict:
+        return {
+            "entries": len(self.entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "coalesced": self.coalesced,
+        }
+
+
+class StatsBuffer(PeriodicTask):
+    """Maintains admin counters and hourly/daily rollups without per-request writes.
+
+    Write paths record increments in memory; a background task flushes them
+    every STATS_FLUSH_INTERVAL seconds as a single unordered bulk write to
+    ``stats``. The ``totals`` document holds running users/likes/matches
+    counts, and ``hour:``/``day:`` documents hold signups/likes/matches events
+    per bucket.
+    """
+
+    def __init__(self, interval: float):
+        super().__init__(interval)
+        self.totals = defaultdict(int)
+        self.rollups = defaultdict(lambda: defaultdict(int))
+
+    def record(self, totals: Optional[dict] = None, events: Optional[dict] = None, at: Optional[datetime] = None):
+        for field, amount in (totals or {}).items():
+            self.totals[field] += amount
+        if events:
+            at = at or datetime.now(timezone.utc)
+            for bucket in (("hour", at.strftime("%Y-%m-%dT%H:00")), ("day", at.strftime("%Y-%m-%d"))):
+                for field, amount in events.items():
+                    self.rollups[bucket][field] += amount
+
+    def pending_totals(self) -> dict:
+        return dict(self.totals)
+
+    async def flush(self):
+        totals, rollups = self.totals, self.rollups
+        self.totals, self.rollups = defaultdict(int), defaultdict(lambda: defaultdict(int))
+        ops = []
+        if any(totals.values()):
+            ops.append(UpdateOne({"_id": "totals"}, {"$inc": dict(totals)}, upsert=True))
+        for (period, bucket), counts in rollups.items():
+            ops.append(UpdateOne(
+                {"_id": f"{period}:{bucket}"},
+                {"$inc": dict(counts), "$setOnInsert": {"period": period, "bucket": bucket}},
+                upsert=True,
+            ))
+        if not ops:
+            return
+        try:
+            await stats_col.bulk_write(ops, ordered=False)
+        except Exception:
+            logger.exception("Failed to flush stats; retrying on the next interval")
+            for field, amount in totals.items():
+                self.totals[field] += amount
+            for bucket, counts in rollups.items():
+                for field, amount in counts.items():
+                    self.rollups[bucket][field] += amount
+
+    async def tick(self):
+        await self.flush()
+
+    async def stop(self):
+        await super().stop()
+        await self.flush()
+
+
+stats_buffer = StatsBuffer(STATS_FLUSH_INTERVAL)
+
+
+async def reconcile_stats_totals():
+    """Recount the running totals from the collections (bootstrap or repair)"""
+    users, likes, matches = await asyncio.gather(
+        users_col.count_documents(NOT_DELETED),
+        likes_col.count_documents({}),
+        matches_col.count_documents({}),
+    )
+    totals = {"users": users, "likes": likes, "matches": matches}
+    await stats_col.update_one({"_id": "totals"}, {"$set": totals}, upsert=True)
+    return totals
+
+
+# (collection, keys, options). Any change here alters INDEX_VERSION, so the
+# next startup re-runs index setup; otherwise it is skipped entirely.
+INDEX_SPECS = [
+    ("users", "firebaseUid", {"unique": True}),
+    ("users", [("coordinates", "2dsphere")], {}),  # Geospatial index
+    ("users", [("gender", 1), ("age", 1)], {}),
+    ("likes", [("fromUserId", 1), ("toUserId", 1)], {"unique": True}),
+    # Keyset pagination indexes: equality prefix, then the page sort order
+    ("likes", [("toUserId", 1), ("createdAt", -1), ("_id", -1)], {}),
+    ("likes", [("fromUserId", 1), ("createdAt", -1), ("_id", -1)], {}),
+    ("matches", "users", {}),
+    ("matches", "pairKey", {"unique": True, "sparse": True}),
+    ("matches", [("users", 1), ("lastActivityAt", -1), ("_id", -1)], {}),
+    ("discovery_decks", "userId", {"unique": True}),
+    ("discovery_decks", "candidates.firebaseUid", {}),
+    ("stats", [("period", 1), ("bucket", -1)], {}),
+    ("messages", [("matchId", 1), ("createdAt", -1), ("_id", -1)], {}),
+    ("deletion_jobs", "userId", {"unique": True}),
+    ("deletion_jobs", [("state", 1), ("leaseUntil", 1)], {}),
+]
+# Covers the data migrations too: a new covenant codes vocabulary re-runs setup
+INDEX_VERSION = hashlib.sha1(repr((INDEX_SPECS, CODES_VERSION)).encode()).hexdigest()[:12]
+
+meta_col = db["_meta"]
+startup_report = {}
+
+
+async def ensure_indexes() -> bool:
+    """Create indexes and run data migrations unless this INDEX_VERSION is already applied.
+
+    Returns True when setup ran.
+    """
+    marker = await meta_col.find_one({"_id": "indexes"})
+    if marker and marker.get("version") == INDEX_VERSION:
+        return False
+    await asyncio.gather(*[
+        db[collection].create_index(keys, **options) for collection, keys, options in INDEX_SPECS
+    ])
+    # Matches created before lastActivityAt existed sort by their last message or creation
+    await matches_col.update_many(
+        {"lastActivityAt": {"$exists": False}},
+        [{"$set": {"lastActivityAt": {"$ifNull": ["$lastMessageAt", "$createdAt"]}}}],
+    )
+    await backfill_covenant_codes(users_col)
+    await meta_col.update_one(
+        {"_id": "indexes"},
+        {"$set": {"version": INDEX_VERSION, "appliedAt": datetime.now(timezone.utc).isoformat()}},
+        upsert=True,
+    )
+    return True
+
+
 @asynccontextmanager
 async def lifespan(app: FastAPI):
-    await users_col.create_index("firebaseUid", unique=True)
-    await users_col.create_index([("coordinates", "2dsphere")])  # Geospatial index
-    await likes_col.create_index([("fromUserId", 1), ("toUserId", 1)], unique=True)
-    await matches_col.create_index("users")
-    count = await users_col.count_documents({})
-    if count == 0:
+    started = time.perf_counter()
+    indexes_applied, _, _ = await asyncio.gather(ensure_indexes(), weight_profiles.reload(), open_bio_index())
+    indexed = time.perf_counter()
+
+    if not await users_col.find_one({}, {"_id": 1}):
         now = datetime.now(timezone.utc).isoformat()
         for user in MOCK_USERS:
             user["createdAt"] = now
+            user["covenantCodes"] = encode_profile(user)
         await users_col.insert_many(MOCK_USERS)
+    if not await stats_col.find_one({"_id": "totals"}, {"_id": 1}):
+        await reconcile_stats_totals()
+    seeded = time.perf_counter()
+
+    deck_worker.start()
+    stats_buffer.start()
+    last_message_writer.start()
+    match_summary_worker.start()
+    deletion_worker.start()
+    weight_profiles.start()
+
+    ready = time.perf_counter()
+    startup_report.update({
+        "importSeconds": round(started - _process_started, 3),
+        "indexSeconds": round(indexed - started, 3),
+        "indexVersion": INDEX_VERSION,
+        "indexesApplied": indexes_applied,
+        "seedCheckSeconds": round(seeded - indexed, 3),
+        "totalSeconds": round(ready - _process_started, 3),
+        "readyAt": datetime.now(timezone.utc).isoformat(),
+    })
+    logger.info("Startup complete: %s", startup_report)
     yield
+    await weight_profiles.stop()
+    await deletion_worker.stop()
+    await deck_worker.stop()
+    await match_summary_worker.stop()
+    await stats_buffer.stop()
+    await last_message_writer.stop()
+    password_hasher.shutdown()
+    await close_http_client()
 
 
 app = FastAPI(lifespan=lifespan)
@@ -230,7 +587,87 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor", "X-Weight-Profile"],
 )
+app.add_middleware(MetricsMiddleware)
+
+
+# Fields rendered on profile cards (likes, matches); excludes credentials and contact details
+USER_CARD_PROJECTION = {
+    "_id": 0,
+    "firebaseUid": 1,
+    "name": 1,
+    "age": 1,
+    "gender": 1,
+    "location": 1,
+    "bio": 1,
+    "profileImage": 1,
+    "faith": 1,
+    "faithLevel": 1,
+    "denomination": 1,
+    "values": 1,
+    "intention": 1,
+    "lifestyle": 1,
+    "status": 1,
+    "isPremium": 1,
+}
+
+
+# Extra profile fields a client may request on top of the card with ``fields=``
+USER_EXTRA_FIELDS = (
+    "photos", "coordinates", "birthday", "work", "education", "educationLevel", "height",
+    "exercise", "hometown", "lookingFor", "churchAttendance", "showGenderOnProfile", "createdAt",
+)
+
+
+def user_projection(view: str = "full", fields=None, computed=()) -> dict:
+    """Projection for user lists.
+
+    ``full`` keeps the whole profile minus credentials. ``card`` (implied
+    when ``fields`` is given) keeps USER_CARD_PROJECTION plus any whitelisted
+    extra fields, passed as a list or comma-separated string. ``computed``
+    names pipeline fields such as score or distance that the card must keep,
+    and internal fields such as covenantCodes that the caller strips itself.
+    """
+    if isinstance(fields, str):
+        fields = [f.strip() for f in fields.split(",") if f.strip()]
+    if view == "full" and not fields:
+        projection = {"_id": 0, "passwordHash": 0, "_covenant": 0, "covenantCodes": 0}
+        for name in computed:
+            projection.pop(name, None)
+        return projection
+    projection = dict(USER_CARD_PROJECTION)
+    for name in fields or ():
+        if name not in USER_EXTRA_FIELDS and name not in USER_CARD_PROJECTION:
+            raise HTTPException(400, f"Unknown field: {name}")
+        projection[name] = 1
+    projection["_id"] = 0
+    for name in computed:
+        projection[name] = 1
+    return projection
+
+
+LIST_RESPONSE_HEADERS = ("X-Next-Cursor", "X-Weight-Profile")
+
+
+def json_list_response(items: list, response: Response) -> ORJSONResponse:
+    """Serialize a list endpoint's result with orjson.
+
+    Returning the response directly skips FastAPI's jsonable_encoder pass
+    over every document; the X-Next-Cursor and X-Weight-Profile headers
+    are carried over.
+    """
+    headers = {name: response.headers[name] for name in LIST_RESPONSE_HEADERS if name in response.headers}
+    return ORJSONResponse(items, headers=headers or None)
+
+
+async def fetch_user_cards(uids, projection: dict = USER_CARD_PROJECTION):
+    """Fetch card fields for many users in a single round trip, keyed by firebaseUid"""
+    uids = list(set(uids))
+    if not uids:
+        return {}
+    users = await users_col.find({"firebaseUid": {"$in": uids}, **NOT_DELETED}, projection).to_list(len(uids))
+    return {u["firebaseUid"]: u for u in users}
 
 
 def get_uid(request: Request):
@@ -246,6 +683,12 @@ async def health():
     return {"status": "ok"}
 
 
+@app.get("/metrics", include_in_schema=False)
+async def prometheus_metrics():
+    """Prometheus scrape endpoint: per-route latency, Mongo command timings and pool gauges"""
+    return PlainTextResponse(metrics_registry.render(), media_type="text/plain; version=0.0.4")
+
+
 # ---------- AUTH / USERS ----------
 @app.post("/api/auth/register")
 async def register_user(data: dict):
@@ -255,8 +698,10 @@ async def register_user(data: dict):
         raise HTTPException(400, "firebaseUid and email required")
 
     existing = await users_col.find_one({"firebaseUid": firebase_uid})
+    if existing and existing.get("deletedAt"):
+        raise HTTPException(409, "This account is being deleted. Try again shortly.")
     if existing:
-        return {"message": "User already exists", "user": serialize_doc(existing)}
+        return {"message": "User already exists", "user": serialize_user(existing)}
 
     now = datetime.now(timezone.utc).isoformat()
     user = {
@@ -279,10 +724,84 @@ async def register_user(data: dict):
         "isPremium": False,
         "createdAt": now,
     }
-    await users_col.insert_one(user)
+    await users_col.insert_one({**user, "covenantCodes": encode_profile(user)})
+    stats_buffer.record(totals={"users": 1}, events={"signups": 1})
+    if user["bio"]:
+        await index_bio(firebase_uid, user["bio"])
     return {"message": "User created", "user": serialize_doc(user)}
 
 
+# ---------- PASSWORD HASHING ----------
+class PasswordHasher:
+    """Runs bcrypt hashing and verification on a bounded thread pool.
+
+    bcrypt releases the GIL, so moving it off the event loop keeps other
+    requests flowing during login bursts. At most ``max_workers`` hashes run
+    at once; when more than ``max_queue`` are waiting, new requests are
+    rejected with 503 instead of piling up.
+    """
+
+    def __init__(self, max_workers: int, max_queue: int):
+        self.max_workers = max_workers
+        self.max_queue = max_queue
+        self.executor = None
+        self.in_flight = 0
+        self.peak_queue_depth = 0
+        self.completed = 0
+        self.rejected = 0
+        self.rehashed = 0
+
+    @property
+    def queue_depth(self) -> int:
+        return max(self.in_flight - self.max_workers, 0)
+
+    async def _run(self, fn, *args):
+        if self.queue_depth >= self.max_queue:
+            self.rejected += 1
+            raise HTTPException(503, "Too many sign-in attempts right now. Please try again.")
+        if self.executor is None:
+            self.executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="bcrypt")
+        self.in_flight += 1
+        self.peak_queue_depth = max(self.peak_queue_depth, self.queue_depth)
+        try:
+            return await asyncio.get_running_loop().run_in_executor(self.executor, fn, *args)
+        finally:
+            self.in_flight -= 1
+            self.completed += 1
+
+    async def hash(self, password: str) -> str:
+        return await self._run(get_pwd_context().hash, password)
+
+    async def verify_and_update(self, password: str, stored_hash: str):
+        """Return (valid, new_hash); new_hash is set when the stored hash uses outdated parameters"""
+        return await self._run(get_pwd_context().verify_and_update, password, stored_hash)
+
+    def stats(self) -> dict:
+        return {
+            "workers": self.max_workers,
+            "inFlight": self.in_flight,
+            "queueDepth": self.queue_depth,
+            "peakQueueDepth": self.peak_queue_depth,
+            "completed": self.completed,
+            "rejected": self.rejected,
+            "rehashed": self.rehashed,
+        }
+
+    def shutdown(self):
+        if self.executor is not None:
+            self.executor.shutdown(wait=False, cancel_futures=True)
+            self.executor = None
+
+
+password_hasher = PasswordHasher(PASSWORD_HASH_WORKERS, PASSWORD_HASH_MAX_QUEUE)
+metrics_registry.gauge_callback(
+    "password_hash_queue_depth", "Password hashes waiting for a worker.", lambda: password_hasher.queue_depth
+)
+metrics_registry.gauge_callback(
+    "password_hash_in_flight", "Password hashes queued or running.", lambda: password_hasher.in_flight
+)
+
+
 # ---------- BACKEND AUTH (fallback when Firebase not configured) ----------
 @app.post("/api/auth/signup")
 async def signup_with_password(data: dict):
@@ -295,12 +814,14 @@ async def signup_with_password(data: dict):
     if len(password) < 6:
         raise HTTPException(400, "Password must be at least 6 characters")
 
-    existing = await users_col.find_one({"email": email})
+    existing = await users_col.find_one({"email": email}, {"deletedAt": 1})
+    if existing and existing.get("deletedAt"):
+        raise HTTPException(409, "This account is being deleted. Try again shortly.")
     if existing:
         raise HTTPException(409, "An account with this email already exists. Try signing in.")
 
     uid = f"local_{uuid.uuid4().hex[:16]}"
-    hashed_pw = pwd_context.hash(password)
+    hashed_pw = await password_hasher.hash(password)
     now = datetime.now(timezone.utc).isoformat()
 
     user = {
@@ -324,12 +845,11 @@ async def signup_with_password(data: dict):
         "isPremium": False,
         "createdAt": now,
     }
-    await users_col.insert_one(user)
+    await users_col.insert_one({**user, "covenantCodes": encode_profile(user)})
+    stats_buffer.record(totals={"users": 1}, events={"signups": 1})
 
     token = jwt.encode({"uid": uid, "email": email}, JWT_SECRET, algorithm="HS256")
-    safe_user = serialize_doc(user)
-    if safe_user and "passwordHash" in safe_user:
-        del safe_user["passwordHash"]
+    safe_user = serialize_user(user)
 
     return {"message": "Account created", "token": token, "uid": uid, "user": safe_user}
 
@@ -342,19 +862,23 @@ async def login_with_password(data: dict):
     if not email or not password:
         raise HTTPException(400, "Email and password required")
 
-    user = await users_col.find_one({"email": email})
+    user = await users_col.find_one({"email": email, **NOT_DELETED})
     if not user:
         raise HTTPException(401, "Invalid email or password")
 
     stored_hash = user.get("passwordHash", "")
-    if not stored_hash or not pwd_context.verify(password, stored_hash):
+    if not stored_hash:
         raise HTTPException(401, "Invalid email or password")
+    valid, new_hash = await password_hasher.verify_and_update(password, stored_hash)
+    if not valid:
+        raise HTTPException(401, "Invalid email or password")
+    if new_hash:
+        await users_col.update_one({"_id": user["_id"]}, {"$set": {"passwordHash": new_hash}})
+        password_hasher.rehashed += 1
 
     uid = user.get("firebaseUid")
     token = jwt.encode({"uid": uid, "email": email}, JWT_SECRET, algorithm="HS256")
-    safe_user = serialize_doc(user)
-    if safe_user and "passwordHash" in safe_user:
-        del safe_user["passwordHash"]
+    safe_user = serialize_user(user)
 
     return {"message": "Login successful", "token": token, "uid": uid, "user": safe_user}
 
@@ -362,7 +886,9 @@ async def login_with_password(data: dict):
 @app.get("/api/users/me")
 async def get_my_profile(request: Request):
     uid = get_uid(request)
-    user = await users_col.find_one({"firebaseUid": uid}, {"_id": 0, "passwordHash": 0})
+    user = await users_col.find_one(
+        {"firebaseUid": uid, **NOT_DELETED}, {"_id": 0, "passwordHash": 0, "covenantCodes": 0}
+    )
     if not user:
         raise HTTPException(404, "User not found")
     return user
@@ -383,64 +909,199 @@ async def update_my_profile(request: Request, data: dict):
     if not update:
         raise HTTPException(400, "No valid fields to update")
 
-    result = await users_col.update_one({"firebaseUid": uid}, {"$set": update})
+    result = await users_col.update_one(
+        {"firebaseUid": uid, **NOT_DELETED}, {"$set": {**update, **encoded_update(update)}}
+    )
     if result.matched_count == 0:
         raise HTTPException(404, "User not found")
 
-    user = await users_col.find_one({"firebaseUid": uid}, {"_id": 0})
+    deck_worker.rebuild(uid)
+    if any(field in update for field in MATCH_SUMMARY_FIELDS):
+        match_summary_worker.refresh(uid)
+    if "bio" in update:
+        await index_bio(uid, update["bio"])
+
+    user = await users_col.find_one({"firebaseUid": uid}, {"_id": 0, "covenantCodes": 0})
     return {"message": "Profile updated", "user": user}
 
 
-@app.get("/api/users/discover")
-async def discover_users(request: Request, gender: str = "Female", min_age: int = 18, max_age: int = 50):
+@app.get("/api/users/discover", response_class=ORJSONResponse)
+async def discover_users(
+    request: Request,
+    response: Response,
+    gender: str = "Female",
+    min_age: int = 18,
+    max_age: int = 50,
+    mode: str = Query(default="legacy", pattern="^(legacy|ranked|deck)$"),
+    limit: int = Query(default=50, ge=1, le=200),
+    cursor: Optional[str] = None,
+    view: str = Query(default="full", pattern="^(full|card)$"),
+    fields: Optional[str] = None,
+    required_values: Optional[str] = None,
+    reciprocal: bool = False,
+    bio_weight: float = Query(default=0.0, ge=0.0, le=1.0),
+):
     uid = get_uid(request)
+    # The ranked pipeline computes score in the database; keep it in card projections.
+    # covenantCodes feed the batch scorer and are dropped from the results.
+    projection = user_projection(view, fields, computed=("score", "covenantCodes"))
+    required = [v.strip() for v in (required_values or "").split(",") if v.strip()]
     query = {
         "firebaseUid": {"$ne": uid},
         "gender": gender,
         "age": {"$gte": min_age, "$lte": max_age},
+        **required_values_filter(required),
+        **NOT_DELETED,
     }
-    users = await users_col.find(query, {"_id": 0}).to_list(50)
+    current_user, seen = await asyncio.gather(
+        users_col.find_one({"firebaseUid": uid}, {"_id": 0}),
+        seen_sets.get(uid),
+    )
+    weights = weight_profiles.for_user(uid)
+    response.headers["X-Weight-Profile"] = weights.name
 
-    # Calculate covenant scores
-    current_user = await users_col.find_one({"firebaseUid": uid}, {"_id": 0})
-    results = []
-    for u in users:
-        score_data = calculate_covenant_score(current_user, u)
-        results.append({**u, **score_data})
+    if mode == "ranked":
+        results = await discover_ranked(
+            response, current_user, query, limit, cursor, projection, seen, weights, reciprocal
+        )
+    elif mode == "deck":
+        filters = {"gender": gender, "minAge": min_age, "maxAge": max_age}
+        if required:
+            filters["requiredValues"] = required
+        if reciprocal:
+            filters["reciprocal"] = True
+        results = await discover_from_deck(
+            response, uid, current_user, filters, query, limit, cursor, projection, seen, weights
+        )
+    else:
+        # Already liked or passed users are skipped while reading
+        users, _, _ = await collect_unseen(
+            users_col.find(query, projection).limit(50 + SEEN_SCAN_LIMIT), seen, 50
+        )
 
-    results.sort(key=lambda x: x["score"], reverse=True)
-    return results
+        # Calculate covenant scores
+        results = with_covenant_scores(current_user, users, weights, reciprocal)
+        results.sort(key=lambda x: x["score"], reverse=True)
+
+    if bio_weight and results:
+        results = await blend_bio_similarity(uid, results, bio_weight)
+    return json_list_response(results, response)
+
+
+async def discover_ranked(response: Response, current_user, query: dict, limit: int, cursor: Optional[str],
+                          projection: Optional[dict] = None, seen: Optional["SeenFilter"] = None,
+                          weights: Optional[CompiledWeights] = None, reciprocal: bool = False):
+    """Rank discover candidates inside MongoDB and return one keyset page.
+
+    The covenant score is computed by the aggregation pipeline, so the sort
+    and limit run on the server over every matching candidate rather than on
+    an arbitrary first batch. Pages are ordered by (score desc, firebaseUid
+    asc) and the continuation token is returned in the X-Next-Cursor header.
+    Candidates in ``seen`` are skipped as the results stream in; if more
+    than SEEN_SCAN_LIMIT in a row are skipped, a short page is returned
+    whose cursor resumes after the last row read.
+    """
+    after = _decode_rank_cursor(cursor) if cursor else None
+    scan_limit = limit + 1 + (SEEN_SCAN_LIMIT if seen else 0)
+    pipeline = ranked_pipeline(
+        current_user, query, scan_limit, after, projection or user_projection(), weights, reciprocal
+    )
+    users, scanned, last_read = await collect_unseen(
+        users_col.aggregate(pipeline, batchSize=limit + 1), seen, limit + 1
+    )
+
+    last = None
+    if len(users) > limit:
+        users = users[:limit]
+        last = users[-1]
+    elif scanned == scan_limit:
+        last = last_read
+    if last:
+        response.headers["X-Next-Cursor"] = encode_cursor({"s": last["score"], "u": last["firebaseUid"]})
+
+    # Breakdown and reasons are only needed for the page being returned
+    return with_covenant_scores(current_user, users, weights, reciprocal)
+
+
+def _decode_rank_cursor(cursor: str):
+    position = decode_cursor(cursor)
+    try:
+        return int(position["s"]), str(position["u"])
+    except (KeyError, TypeError, ValueError):
+        raise HTTPException(400, "Invalid cursor")
+
+
+def ranked_pipeline(current_user, query: dict, limit: int, after=None, projection: Optional[dict] = None,
+                    weights: Optional[CompiledWeights] = None, reciprocal: bool = False):
+    """Aggregation pipeline returning candidates in (score desc, firebaseUid asc) order.
+
+    ``after`` is the (score, firebaseUid) of the last row already served.
+    """
+    pipeline = [{"$match": query}, *covenant_score_stages(current_user, weights, reciprocal)]
+    if after:
+        last_score, last_uid = after
+        pipeline.append({"$match": {"$or": [
+            {"score": {"$lt": last_score}},
+            {"score": last_score, "firebaseUid": {"$gt": last_uid}},
+        ]}})
+    pipeline += [
+        {"$sort": {"score": -1, "firebaseUid": 1}},
+        {"$limit": limit},
+    ]
+    if projection:
+        pipeline.append({"$project": projection})
+    return pipeline
 
 
 @app.get("/api/users/{firebase_uid}")
 async def get_user_by_uid(firebase_uid: str):
-    user = await users_col.find_one({"firebaseUid": firebase_uid}, {"_id": 0})
+    user = await users_col.find_one({"firebaseUid": firebase_uid, **NOT_DELETED}, {"_id": 0, "covenantCodes": 0})
     if not user:
         raise HTTPException(404, "User not found")
     return user
 
 
 # ---------- COVENANT ALGORITHM ----------
-def calculate_covenant_score(current_user, candidate):
+# Weights come from the viewer's weight profile (see covenant_weights.py);
+# the scorers fall back to the default profile when none is passed.
+WEIGHT_PROFILE_RELOAD_INTERVAL = float(os.environ.get("WEIGHT_PROFILE_RELOAD_INTERVAL", "30"))
+WEIGHT_EXPERIMENT_SALT = os.environ.get("WEIGHT_EXPERIMENT_SALT", "")
+
+weight_profiles_col = db["weight_profiles"]
+weight_profiles = WeightProfiles(weight_profiles_col, WEIGHT_PROFILE_RELOAD_INTERVAL, WEIGHT_EXPERIMENT_SALT)
+
+
+def required_values_filter(values) -> dict:
+    """Query matching users who hold every one of ``values``.
+
+    Known values are tested against the covenantCodes bitmask with
+    $bitsAllSet; values outside the vocabulary fall back to the readable list.
+    """
+    query = {}
+    mask = values_mask(values)
+    if mask:
+        query["covenantCodes.values"] = {"$bitsAllSet": Int64(mask)}
+    unknown = [v for v in values if v not in VALUE_BITS]
+    if unknown:
+        query["values"] = {"$all": unknown}
+    return query
+
+
+def calculate_covenant_score(current_user, candidate, weights: Optional[CompiledWeights] = None):
     if not current_user:
         current_user = {}
+    weights = weights or DEFAULT_COMPILED
 
     reasons = []
 
-    # Faith Score (35 max)
-    faith_score = 0
-    if candidate.get("faithLevel") == "Very Serious":
-        faith_score += 15
-    elif candidate.get("faithLevel") == "Practicing":
-        faith_score += 10
-    elif candidate.get("faithLevel") == "Cultural":
-        faith_score += 5
+    # Faith Score (35 max with the default weights)
+    faith_score = weights.points["faithLevel"].get(candidate.get("faithLevel"), weights.defaults["faithLevel"])
 
     if candidate.get("denomination") == current_user.get("denomination"):
-        faith_score += 20
+        faith_score += weights.denomination_match
         reasons.append(f"Denomination Match: {candidate.get('denomination')}")
     elif candidate.get("faith") == "Christian":
-        faith_score += 10
+        faith_score += weights.christian
 
     # Values Score (30 max)
     values_score = 0
@@ -448,23 +1109,19 @@ def calculate_covenant_score(current_user, candidate):
     their_values = set(candidate.get("values", []))
     shared = my_values & their_values
     if my_values:
-        values_score = int((len(shared) / max(len(my_values), 1)) * 30)
+        values_score = int((len(shared) / max(len(my_values), 1)) * weights.values)
     else:
-        values_score = 15
+        values_score = weights.no_values
     if shared:
         reasons.append(f"Shared Values: {', '.join(shared)}")
 
     # Intention Score (25 max)
-    intention_score = 0
-    intention_map = {"Marriage ASAP": 25, "Marriage in 1-2 years": 20, "Dating to Marry": 15, "Unsure": 5}
-    intention_score = intention_map.get(candidate.get("intention", ""), 10)
+    intention_score = weights.points["intention"].get(candidate.get("intention", ""), weights.defaults["intention"])
     if candidate.get("intention") == "Marriage ASAP":
         reasons.append("Ready for Marriage Now")
 
     # Lifestyle Score (10 max)
-    lifestyle_score = 0
-    lifestyle_map = {"Traditional": 10, "Moderate": 5, "Modern": 3}
-    lifestyle_score = lifestyle_map.get(candidate.get("lifestyle", ""), 3)
+    lifestyle_score = weights.points["lifestyle"].get(candidate.get("lifestyle", ""), weights.defaults["lifestyle"])
     if candidate.get("lifestyle") == "Traditional":
         reasons.append("Traditional Lifestyle")
 
@@ -482,6 +1139,650 @@ def calculate_covenant_score(current_user, candidate):
     }
 
 
+def _code_points(field: str, weights: CompiledWeights):
+    return {"$arrayElemAt": [weights.pipeline_tables[field], {"$ifNull": [f"$covenantCodes.{field}", 0]}]}
+
+
+def _shared_values_count(my_values: set):
+    """Expression counting the candidate's values shared with ``my_values``.
+
+    Aggregation has no popcount, so each of the viewer's bits is tested on
+    the candidate's mask with an exact Int64 $mod; values outside the
+    vocabulary are intersected with the readable list.
+    """
+    mask = {"$ifNull": ["$covenantCodes.values", 0]}
+    terms = [
+        {"$cond": [{"$gte": [{"$mod": [mask, Int64(bit << 1)]}, Int64(bit)]}, 1, 0]}
+        for bit in (VALUE_BITS[name] for name in my_values if name in VALUE_BITS)
+    ]
+    unknown = [v for v in my_values if v not in VALUE_BITS]
+    if unknown:
+        terms.append({"$size": {"$setIntersection": [{"$ifNull": ["$values", []]}, unknown]}})
+    return {"$add": terms}
+
+
+def covenant_score_stages(current_user, weights: Optional[CompiledWeights] = None, reciprocal: bool = False):
+    """Aggregation stages that add the covenant ``score`` to each candidate.
+
+    Mirrors calculate_covenant_scores so server-side ranking agrees with the
+    scores reported to the client, reading the candidates' covenantCodes
+    rather than their readable fields. With ``reciprocal`` the score is the
+    harmonic mean of both directions. Intermediate values live under
+    ``_covenant`` and should be projected out by the caller.
+    """
+    if not current_user:
+        current_user = {}
+    weights = weights or DEFAULT_COMPILED
+    my_values = set(current_user.get("values", []))
+    my_denomination = current_user.get("denomination")
+    my_denomination_code = encode_field("denomination", my_denomination)
+
+    shared = _shared_values_count(my_values) if my_values else 0
+    if my_values:
+        values_score = {"$floor": {"$multiply": [{"$divide": [shared, len(my_values)]}, weights.values]}}
+    else:
+        values_score = weights.no_values
+    if my_denomination_code:
+        same_denomination = {"$eq": [{"$ifNull": ["$covenantCodes.denomination", 0]}, my_denomination_code]}
+    else:
+        # Free-text denominations have no code; compare the readable field
+        same_denomination = {"$eq": [{"$ifNull": ["$denomination", None]}, my_denomination]}
+
+    covenant = {
+        "faith": {"$add": [
+            _code_points("faithLevel", weights),
+            {"$cond": [
+                same_denomination,
+                weights.denomination_match,
+                {"$cond": [{"$eq": ["$covenantCodes.faith", CODES["faith"]["Christian"]]}, weights.christian, 0]},
+            ]},
+        ]},
+        "values": values_score,
+        "intention": _code_points("intention", weights),
+        "lifestyle": _code_points("lifestyle", weights),
+    }
+    if reciprocal:
+        # The viewer as scored by each candidate; only the denomination match
+        # and the share of the candidate's own values vary per candidate
+        my_codes = encode_profile(current_user)
+        their_count = {"$size": {"$setUnion": [{"$ifNull": ["$values", []]}, []]}}
+        covenant["reverse"] = {"$min": [
+            {"$add": [
+                int(weights.tables["faithLevel"][my_codes["faithLevel"]]
+                    + weights.tables["intention"][my_codes["intention"]]
+                    + weights.tables["lifestyle"][my_codes["lifestyle"]]),
+                {"$cond": [
+                    same_denomination,
+                    weights.denomination_match,
+                    weights.christian if my_codes["faith"] == CODES["faith"]["Christian"] else 0,
+                ]},
+                {"$cond": [
+                    {"$eq": [their_count, 0]},
+                    weights.no_values,
+                    {"$floor": {"$multiply": [{"$divide": [shared, their_count]}, weights.values]}},
+                ]},
+            ]},
+            100,
+        ]}
+
+    stages = [
+        {"$addFields": {"_covenant": covenant}},
+        {"$addFields": {"score": {"$min": [
+            {"$add": ["$_covenant.faith", "$_covenant.values", "$_covenant.intention", "$_covenant.lifestyle"]},
+            100,
+        ]}}},
+    ]
+    if reciprocal:
+        both = {"$add": ["$score", "$_covenant.reverse"]}
+        stages.append({"$addFields": {"score": {"$cond": [
+            {"$eq": [both, 0]},
+            0,
+            {"$floor": {"$divide": [{"$multiply": [2, "$score", "$_covenant.reverse"]}, both]}},
+        ]}}})
+    return stages
+
+
+def _code_column(codes: list, field: str, dtype=np.int64):
+    return np.fromiter((c.get(field, 0) for c in codes), dtype=dtype, count=len(codes))
+
+
+def calculate_covenant_scores(current_user, candidates, weights: Optional[CompiledWeights] = None,
+                              reciprocal: bool = False):
+    """Batch version of calculate_covenant_score.
+
+    Works on the candidates' covenantCodes (encoded on the fly when a
+    projection left them out): shared values are a popcount of the ANDed
+    bitmasks and categorical fields are NumPy table lookups, so ranking
+    thousands of candidates costs a handful of array operations instead of
+    a Python scoring pass per candidate. The weight profile's tables are
+    indexed directly, so any profile costs the same. Returns one result per
+    candidate, identical to calculate_covenant_score.
+
+    With ``reciprocal`` the viewer is also scored from each candidate's side
+    (calculate_covenant_score(candidate, current_user)) in the same pass.
+    ``score`` becomes the floored harmonic mean of the two directions, which
+    stays low unless both sides score well, and ``reciprocal`` holds both.
+    """
+    if not current_user:
+        current_user = {}
+    weights = weights or DEFAULT_COMPILED
+    n = len(candidates)
+    if n == 0:
+        return []
+
+    my_denomination = current_user.get("denomination")
+    my_denomination_code = encode_field("denomination", my_denomination)
+    my_values = set(current_user.get("values", []))
+    my_mask = values_mask(my_values)
+    my_unknown_values = {v for v in my_values if v not in VALUE_BITS}
+
+    codes = [c.get("covenantCodes") or encode_profile(c) for c in candidates]
+    faith_level = _code_column(codes, "faithLevel")
+    intention = _code_column(codes, "intention")
+    lifestyle = _code_column(codes, "lifestyle")
+    if my_denomination_code:
+        same_denomination = _code_column(codes, "denomination") == my_denomination_code
+    else:
+        same_denomination = np.fromiter(
+            (c.get("denomination") == my_denomination for c in candidates), dtype=bool, count=n
+        )
+    christian = _code_column(codes, "faith") == CODES["faith"]["Christian"]
+    shared_masks = _code_column(codes, "values", np.uint64) & np.uint64(my_mask)
+    shared_count = np.bitwise_count(shared_masks).astype(np.int64)
+    unknown_shared = None
+    if my_unknown_values:
+        unknown_shared = [sorted(my_unknown_values.intersection(c.get("values", []))) for c in candidates]
+        shared_count += np.fromiter((len(s) for s in unknown_shared), dtype=np.int64, count=n)
+
+    faith_scores = weights.tables["faithLevel"][faith_level] + np.where(
+        same_denomination, weights.denomination_match, np.where(christian, weights.christian, 0)
+    )
+    if my_values:
+        values_scores = np.floor(shared_count / max(len(my_values), 1) * weights.values).astype(np.int64)
+    else:
+        values_scores = np.full(n, weights.no_values, dtype=np.int64)
+    intention_scores = weights.tables["intention"][intention]
+    lifestyle_scores = weights.tables["lifestyle"][lifestyle]
+    totals = np.minimum(faith_scores + values_scores + intention_scores + lifestyle_scores, 100)
+    scores = totals
+
+    if reciprocal:
+        # The viewer's own fields score the same for everyone; only the
+        # denomination match and the share of the candidate's values vary
+        my_codes = encode_profile(current_user)
+        their_count = np.fromiter((len(set(c.get("values", []))) for c in candidates), dtype=np.int64, count=n)
+        reverse_values = np.where(
+            their_count > 0,
+            np.floor(shared_count / np.maximum(their_count, 1) * weights.values).astype(np.int64),
+            weights.no_values,
+        )
+        my_christian = weights.christian if my_codes["faith"] == CODES["faith"]["Christian"] else 0
+        reverse = np.minimum(
+            weights.tables["faithLevel"][my_codes["faithLevel"]]
+            + weights.tables["intention"][my_codes["intention"]]
+            + weights.tables["lifestyle"][my_codes["lifestyle"]]
+            + np.where(same_denomination, weights.denomination_match, my_christian)
+            + reverse_values,
+            100,
+        )
+        both = totals + reverse
+        scores = np.where(both > 0, np.floor(2 * totals * reverse / np.maximum(both, 1)), 0).astype(np.int64)
+        forward_list, reverse_list = totals.tolist(), reverse.tolist()
+
+    denomination_match = same_denomination.tolist()
+    shared_any = (shared_count > 0).tolist()
+    shared_masks = shared_masks.tolist()
+    ready = (intention == CODES["intention"]["Marriage ASAP"]).tolist()
+    traditional = (lifestyle == CODES["lifestyle"]["Traditional"]).tolist()
+    results = []
+    for i, (total, faith, values, intent, life) in enumerate(zip(
+        scores.tolist(), faith_scores.tolist(), values_scores.tolist(),
+        intention_scores.tolist(), lifestyle_scores.tolist(),
+    )):
+        reasons = []
+        if denomination_match[i]:
+            reasons.append(f"Denomination Match: {candidates[i].get('denomination')}")
+        if shared_any[i]:
+            shared = mask_values(shared_masks[i]) + (unknown_shared[i] if unknown_shared else [])
+            reasons.append(f"Shared Values: {', '.join(shared)}")
+        if ready[i]:
+            reasons.append("Ready for Marriage Now")
+        if traditional[i]:
+            reasons.append("Traditional Lifestyle")
+        result = {
+            "score": total,
+            "breakdown": {
+                "faithScore": faith,
+                "valuesScore": values,
+                "intentionScore": intent,
+                "lifestyleScore": life,
+            },
+            "reasons": reasons,
+        }
+        if reciprocal:
+            result["reciprocal"] = {"forward": forward_list[i], "reverse": reverse_list[i]}
+        results.append(result)
+    return results
+
+
+def with_covenant_scores(current_user, users: list, weights: Optional[CompiledWeights] = None,
+                         reciprocal: bool = False) -> list:
+    """Merge batch covenant scores into ``users``, dropping their covenantCodes"""
+    scores = calculate_covenant_scores(current_user, users, weights, reciprocal)
+    results = []
+    for user, score_data in zip(users, scores):
+        user.pop("covenantCodes", None)
+        results.append({**user, **score_data})
+    return results
+
+
+# ---------- DISCOVERY DECKS ----------
+def deck_query(uid: str, filters: dict) -> dict:
+    return {
+        "firebaseUid": {"$ne": uid},
+        "gender": filters["gender"],
+        "age": {"$gte": filters["minAge"], "$lte": filters["maxAge"]},
+        **required_values_filter(filters.get("requiredValues", ())),
+        **NOT_DELETED,
+    }
+
+
+async def build_deck(uid: str, filters: dict, current_user=None):
+    """Rank the viewer's top DISCOVER_DECK_SIZE candidates and store them as their deck"""
+    if current_user is None:
+        current_user = await users_col.find_one({"firebaseUid": uid}, {"_id": 0})
+    weights = weight_profiles.for_user(uid)
+    pipeline = ranked_pipeline(
+        current_user, deck_query(uid, filters), DISCOVER_DECK_SIZE,
+        projection={"_id": 0, "firebaseUid": 1, "score": 1}, weights=weights,
+        reciprocal=filters.get("reciprocal", False),
+    )
+    ranked = await users_col.aggregate(pipeline).to_list(DISCOVER_DECK_SIZE)
+    deck = {
+        "userId": uid,
+        "filters": filters,
+        "weightProfile": weights.name,
+        "candidates": [{"firebaseUid": c["firebaseUid"], "score": int(c["score"])} for c in ranked],
+        "stale": False,
+        "builtAt": datetime.now(timezone.utc).isoformat(),
+    }
+    await decks_col.replace_one({"userId": uid}, deck, upsert=True)
+    return deck
+
+
+class DeckWorker(QueueWorker):
+    """Background task that keeps materialized discover decks up to date.
+
+    Write paths enqueue cheap operations here instead of touching decks
+    inline: rebuilds are de-duplicated per user, while removals are merged
+    per user and patched directly into the stored deck.
+    """
+
+    label = "Deck worker"
+
+    def __init__(self):
+        super().__init__()
+        self.pending_removals = {}
+
+    def rebuild(self, uid: str):
+        """Mark the user's deck stale and rebuild it in the background"""
+        self.enqueue_once("rebuild", uid)
+
+    def remove_candidates(self, uid: str, candidate_uids):
+        """Drop candidates from the user's deck (e.g. after swipes).
+
+        Removals queued for a user before the worker reaches them are merged
+        into a single ``$pull``.
+        """
+        self.pending_removals.setdefault(uid, set()).update(candidate_uids)
+        self.enqueue_once("remove", uid)
+
+    def remove_user(self, uid: str):
+        """Delete the user's own deck and remove them from every other deck"""
+        self.enqueue("purge", uid)
+
+    async def handle(self, op: str, uid: str, arg):
+        if op == "rebuild":
+            await self._rebuild(uid)
+        elif op == "remove":
+            removed = sorted(self.pending_removals.pop(uid, ()))
+            if removed:
+                await decks_col.update_one(
+                    {"userId": uid}, {"$pull": {"candidates": {"firebaseUid": {"$in": removed}}}}
+                )
+        elif op == "purge":
+            await decks_col.delete_one({"userId": uid})
+            await decks_col.update_many(
+                {"candidates.firebaseUid": uid}, {"$pull": {"candidates": {"firebaseUid": uid}}}
+            )
+
+    async def _rebuild(self, uid: str):
+        # Only users who have used deck mode have a deck worth keeping warm
+        deck = await decks_col.find_one_and_update(
+            {"userId": uid}, {"$set": {"stale": True}}, {"_id": 0, "filters": 1}
+        )
+        if deck:
+            await build_deck(uid, deck["filters"])
+
+
+deck_worker = DeckWorker()
+
+
+def deck_expired(deck: dict) -> bool:
+    try:
+        built_at = datetime.fromisoformat(deck["builtAt"])
+    except (KeyError, TypeError, ValueError):
+        return True
+    return (datetime.now(timezone.utc) - built_at).total_seconds() > DISCOVER_DECK_MAX_AGE
+
+
+async def discover_from_deck(response: Response, uid: str, current_user, filters: dict, query: dict, limit: int,
+                             cursor: Optional[str], projection: Optional[dict] = None,
+                             seen: Optional["SeenFilter"] = None, weights: Optional[CompiledWeights] = None):
+    """Serve a discover page from the viewer's precomputed deck.
+
+    A missing deck, or one built for different filters or another weight
+    profile, is built inline; a stale deck, or one older than
+    DISCOVER_DECK_MAX_AGE, is still served while a rebuild is queued. Once
+    the deck runs out, paging continues with a fresh ranked query over the
+    candidates not in the deck; its cursors carry ``"r": 1`` so later pages
+    skip the deck.
+    """
+    deck = await decks_col.find_one({"userId": uid}, {"_id": 0})
+    weights = weights or weight_profiles.for_user(uid)
+    if not deck or deck.get("filters") != filters or deck.get("weightProfile") != weights.name:
+        deck = await build_deck(uid, filters, current_user)
+    elif deck.get("stale") or deck_expired(deck):
+        deck_worker.rebuild(uid)
+
+    position = decode_cursor(cursor) if cursor else None
+    if position and position.get("r"):
+        return await discover_past_deck(response, uid, deck, current_user, filters, query, limit, cursor,
+                                        projection, seen, weights)
+
+    deck_size = len(deck["candidates"])
+    candidates = [c for c in deck["candidates"] if not seen or c["firebaseUid"] not in seen]
+    start = 0
+    if cursor:
+        after = _decode_rank_cursor(cursor)
+        start = next(
+            (i for i, c in enumerate(candidates) if (-c["score"], c["firebaseUid"]) > (-after[0], after[1])),
+            len(candidates),
+        )
+    page = candidates[start:start + limit]
+    if not page:
+        return await discover_past_deck(response, uid, deck, current_user, filters, query, limit, None,
+                                        projection, seen, weights)
+
+    # Re-apply the filters so profile edits since the build are respected
+    found = await users_col.find(
+        {**query, "firebaseUid": {"$in": [c["firebaseUid"] for c in page]}},
+        projection or user_projection(),
+    ).to_list(len(page))
+    by_uid = {u["firebaseUid"]: u for u in found}
+    users = [by_uid[c["firebaseUid"]] for c in page if c["firebaseUid"] in by_uid]
+
+    last = page[-1]
+    if start + limit < len(candidates) or deck_size >= DISCOVER_DECK_SIZE:
+        response.headers["X-Next-Cursor"] = encode_cursor({"s": last["score"], "u": last["firebaseUid"]})
+
+    return with_covenant_scores(current_user, users, weights, filters.get("reciprocal", False))
+
+
+async def discover_past_deck(response: Response, uid: str, deck: dict, current_user, filters: dict, query: dict,
+                             limit: int, cursor: Optional[str], projection: Optional[dict] = None,
+                             seen: Optional["SeenFilter"] = None, weights: Optional[CompiledWeights] = None):
+    """Ranked page over the candidates outside the deck, starting from the top score.
+
+    Ranking from the top rather than after the deck's lowest score lets users
+    who joined or edited their profile since the build surface in score order.
+    """
+    in_deck = [c["firebaseUid"] for c in deck["candidates"]]
+    users = await discover_ranked(
+        response, current_user, {**query, "firebaseUid": {"$nin": [uid, *in_deck]}}, limit, cursor,
+        projection, seen, weights, filters.get("reciprocal", False),
+    )
+    next_cursor = response.headers.get("X-Next-Cursor")
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = encode_cursor({**decode_cursor(next_cursor), "r": 1})
+    return users
+
+
+# ---------- BIO SIMILARITY ----------
+BIO_INDEX_PATH = os.environ.get(
+    "BIO_INDEX_PATH", os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "bio_index")
+)
+BIO_INDEX_DIM = int(os.environ.get("BIO_INDEX_DIM", "512"))
+# Similar users are fetched several times over so deleted or filtered-out users can be dropped
+BIO_SIMILAR_OVERFETCH = int(os.environ.get("BIO_SIMILAR_OVERFETCH", "4"))
+
+bio_index = BioIndex(BIO_INDEX_PATH, BIO_INDEX_DIM)
+
+
+async def open_bio_index():
+    try:
+        await asyncio.to_thread(bio_index.open)
+    except Exception:
+        logger.exception("Bio index unavailable at %s; bio similarity is disabled", BIO_INDEX_PATH)
+
+
+async def index_bio(uid: str, bio):
+    """Re-embed a user's bio off the event loop; the index is a best-effort signal"""
+    try:
+        await asyncio.to_thread(bio_index.upsert, uid, bio if isinstance(bio, str) else "")
+    except Exception:
+        logger.exception("Failed to index the bio of %s", uid)
+
+
+async def unindex_bio(uid: str):
+    """Drop a user's bio from the index; failures are logged, not raised"""
+    try:
+        await asyncio.to_thread(bio_index.remove, uid)
+    except Exception:
+        logger.exception("Failed to remove the bio of %s from the index", uid)
+
+
+async def blend_bio_similarity(uid: str, results: list, weight: float) -> list:
+    """Re-rank a scored page by mixing the covenant score with bio similarity.
+
+    Adds ``bioSimilarity`` (cosine, -1 to 1) and ``blendedScore``. Only the
+    returned page is re-ordered, so keyset cursors are unaffected.
+    """
+    similarity = await asyncio.to_thread(bio_index.similarities, uid, [r["firebaseUid"] for r in results])
+    for result in results:
+        s = similarity[result["firebaseUid"]]
+        result["bioSimilarity"] = round(s, 4)
+        result["blendedScore"] = round(result["score"] * (1 - weight) + max(s, 0.0) * 100 * weight, 1)
+    results.sort(key=lambda r: r["blendedScore"], reverse=True)
+    return results
+
+
+@app.get("/api/users/me/similar", response_class=ORJSONResponse)
+async def get_similar_users(
+    request: Request,
+    limit: int = Query(default=20, ge=1, le=100),
+    gender: Optional[str] = None,
+    view: str = Query(default="full", pattern="^(full|card)$"),
+    fields: Optional[str] = None,
+):
+    """Users whose bios read most like the caller's, best first, from the local bio index"""
+    uid = get_uid(request)
+    projection = user_projection(view, fields)
+    ranked = await asyncio.to_thread(bio_index.similar, uid, limit * BIO_SIMILAR_OVERFETCH)
+    if not ranked:
+        return ORJSONResponse([])
+    query = {"firebaseUid": {"$in": [u for u, _ in ranked]}, **NOT_DELETED}
+    if gender:
+        query["gender"] = gender
+    found = await users_col.find(query, projection).to_list(len(ranked))
+    by_uid = {u["firebaseUid"]: u for u in found}
+    results = [{**by_uid[u], "bioSimilarity": round(s, 4)} for u, s in ranked if u in by_uid]
+    return ORJSONResponse(results[:limit])
+
+
+# ---------- SEEN SET ----------
+WORD_MASK = (1 << 64) - 1
+
+
+def seen_hashes(member: str):
+    """Two 64-bit hashes of a uid, from one blake2b digest, for double hashing"""
+    digest = hashlib.blake2b(member.encode(), digest_size=16).digest()
+    return int.from_bytes(digest[:8], "little"), int.from_bytes(digest[8:], "little") | 1
+
+
+def seen_positions(generation: dict, h1: int, h2: int):
+    """(word, bit) positions of a hashed uid in one generation of 64-bit words"""
+    for i in range(generation["k"]):
+        position = (h1 + i * h2) % generation["m"]
+        yield position >> 6, position & 63
+
+
+def seen_generation(index: int) -> dict:
+    """Empty generation ``index`` of a seen filter, sized from the current settings"""
+    capacity = SEEN_FILTER_CAPACITY << index
+    hashes = math.ceil(math.log2(2 ** (index + 1) / SEEN_FILTER_ERROR))
+    words = math.ceil(capacity * hashes / math.log(2) / 64)
+    return {"n": capacity, "k": hashes, "m": words * 64, "count": 0, "words": [0] * words}
+
+
+def to_int64(word: int) -> Int64:
+    """A 64-bit word as the signed Int64 MongoDB stores, so bit 63 is usable"""
+    return Int64(word - (1 << 64) if word >> 63 else word)
+
+
+def stored_generation(generation: dict) -> dict:
+    return {**generation, "words": [to_int64(w) for w in generation["words"]]}
+
+
+class SeenFilter:
+    """Scalable Bloom filter over the uids a user has liked, passed on or matched with.
+
+    Members are added to the newest generation; once it holds ``n`` members
+    the next one is started. False positives hide a small fraction of
+    unseen candidates; a seen candidate is never shown again.
+    """
+
+    __slots__ = ("generations",)
+
+    def __init__(self, generations=None):
+        self.generations = [
+            {**g, "words": [int(w) & WORD_MASK for w in g["words"]]} for g in generations
+        ] if generations else [seen_generation(0)]
+
+    def __contains__(self, member: str) -> bool:
+        h1, h2 = seen_hashes(member)
+        return any(
+            all(g["words"][w] >> b & 1 for w, b in seen_positions(g, h1, h2)) for g in self.generations
+        )
+
+    @property
+    def full(self) -> bool:
+        newest = self.generations[-1]
+        return newest["count"] >= newest["n"]
+
+    def add(self, member: str) -> dict:
+        """Set the member's bits in the newest generation; returns the word masks that changed, for ``$bit``"""
+        newest = self.generations[-1]
+        masks = {}
+        for w, b in seen_positions(newest, *seen_hashes(member)):
+            masks[w] = masks.get(w, 0) | 1 << b
+        for w, mask in masks.items():
+            newest["words"][w] |= mask
+        newest["count"] += 1
+        return masks
+
+
+async def collect_unseen(cursor, seen: Optional[SeenFilter], count: int):
+    """Read a Mongo cursor until ``count`` rows not in ``seen``.
+
+    Returns (rows, rows read, last row read).
+    """
+    rows, scanned, last = [], 0, None
+    async for row in cursor:
+        scanned += 1
+        last = row
+        if seen is None or row["firebaseUid"] not in seen:
+            rows.append(row)
+            if len(rows) >= count:
+                break
+    await cursor.close()
+    return rows, scanned, last
+
+
+class SeenSets:
+    """Per-user seen filters persisted in ``seen_sets`` and cached in memory.
+
+    Each document stores the filter's generations, each an array of Int64
+    words. Additions OR the changed words in place with ``$bit``, so
+    concurrent writers never overwrite each other's bits. Other workers see
+    them once their cached copy expires after SEEN_CACHE_TTL seconds; until
+    then they may keep adding to a generation another worker has retired,
+    which only fills it slightly past capacity.
+    """
+
+    def __init__(self):
+        self.cache = TTLCache(SEEN_CACHE_SIZE, SEEN_CACHE_TTL)
+
+    async def get(self, uid: str) -> SeenFilter:
+        return await self.cache.get_or_load(uid, lambda: self._load(uid))
+
+    async def add(self, uid: str, members: list):
+        if not members:
+            return
+        seen = await self.get(uid)
+        members = [m for m in dict.fromkeys(members) if m not in seen]
+        if not members:
+            return
+        if seen.full:
+            seen = await self._rotate(uid, seen)
+        newest = len(seen.generations) - 1
+        masks = {}
+        for member in members:
+            for w, mask in seen.add(member).items():
+                masks[w] = masks.get(w, 0) | mask
+        await seen_col.update_one({"_id": uid}, {
+            "$bit": {f"generations.{newest}.words.{w}": {"or": to_int64(mask)} for w, mask in masks.items()},
+            "$inc": {f"generations.{newest}.count": len(members)},
+        })
+
+    async def _rotate(self, uid: str, seen: SeenFilter) -> SeenFilter:
+        """Start the next generation, unless another worker already has"""
+        await seen_col.update_one(
+            {"_id": uid, "generations": {"$size": len(seen.generations)}},
+            {"$push": {"generations": stored_generation(seen_generation(len(seen.generations)))}},
+        )
+        seen = await self._load(uid)
+        self.cache.set(uid, seen)
+        return seen
+
+    async def _load(self, uid: str) -> SeenFilter:
+        doc = await seen_col.find_one({"_id": uid})
+        if doc:
+            return SeenFilter(doc["generations"])
+
+        # First use: seed the filter from likes and matches made before it existed
+        seen = SeenFilter()
+        likes, matches = await asyncio.gather(
+            likes_col.find({"fromUserId": uid}, {"_id": 0, "toUserId": 1}).to_list(None),
+            matches_col.find({"users": uid}, {"_id": 0, "users": 1}).to_list(None),
+        )
+        members = [like["toUserId"] for like in likes]
+        members += [other for match in matches for other in match["users"] if other != uid]
+        for member in dict.fromkeys(members):
+            if seen.full:
+                seen.generations.append(seen_generation(len(seen.generations)))
+            seen.add(member)
+        try:
+            await seen_col.insert_one({"_id": uid, "generations": [stored_generation(g) for g in seen.generations]})
+        except DuplicateKeyError:
+            doc = await seen_col.find_one({"_id": uid})
+            return SeenFilter(doc["generations"])
+        return seen
+
+
+seen_sets = SeenSets()
+
+
 # ---------- LIKES ----------
 @app.post("/api/likes")
 async def like_user(request: Request, data: dict):
@@ -492,119 +1793,592 @@ async def like_user(request: Request, data: dict):
     if uid == to_user_id:
         raise HTTPException(400, "Cannot like yourself")
 
-    existing = await likes_col.find_one({"fromUserId": uid, "toUserId": to_user_id})
-    if existing:
+    # 1st round trip: record the like while checking that both users are live;
+    # an existing like document means it was already sent
+    now = datetime.now(timezone.utc).isoformat()
+
+    async def record_like():
+        try:
+            return await likes_col.update_one(
+                {"fromUserId": uid, "toUserId": to_user_id},
+                {"$setOnInsert": {"createdAt": now}},
+                upsert=True,
+            )
+        except DuplicateKeyError:
+            return None
+
+    live, result = await asyncio.gather(
+        users_col.find(
+            {"firebaseUid": {"$in": [uid, to_user_id]}, **NOT_DELETED}, {"_id": 1}
+        ).to_list(2),
+        record_like(),
+    )
+    if len(live) < 2:
+        if result is not None and result.upserted_id is not None:
+            await likes_col.delete_one({"_id": result.upserted_id})
+        raise HTTPException(404, "User not found")
+    if result is None or result.upserted_id is None:
         return {"message": "Already liked", "matched": False}
+    deck_worker.remove_candidates(uid, [to_user_id])
+
+    # 2nd round trip: atomically consume a reciprocal like (the seen-set
+    # update runs alongside it). Both likes are written before either side
+    # checks, so of two simultaneous reciprocal likes at least one request
+    # always sees the other.
+    mutual, _ = await asyncio.gather(
+        likes_col.find_one_and_delete({"fromUserId": to_user_id, "toUserId": uid}),
+        seen_sets.add(uid, [to_user_id]),
+    )
+    if not mutual:
+        stats_buffer.record(totals={"likes": 1}, events={"likes": 1})
+        return {"message": "Like sent", "matched": False}
 
-    now = datetime.now(timezone.utc).isoformat()
-    await likes_col.insert_one({
-        "fromUserId": uid,
-        "toUserId": to_user_id,
+    created, own_like = await asyncio.gather(
+        create_match(sorted([uid, to_user_id]), now),
+        likes_col.delete_one({"fromUserId": uid, "toUserId": to_user_id}),
+    )
+    # +1 for our like, -1 for the consumed reciprocal, -1 if ours was deleted here
+    stats_buffer.record(
+        totals={"likes": -own_like.deleted_count, "matches": int(bool(created))},
+        events={"likes": 1, "matches": int(bool(created))},
+    )
+    if created is None:
+        raise HTTPException(404, "User not found")
+    return {"message": "It's a match!", "matched": True}
+
+
+def new_match_fields(user_pair: list, summaries: dict, now: str) -> dict:
+    """Fields of a freshly created match document, for ``$setOnInsert``"""
+    return {
+        "pairKey": "|".join(user_pair),
+        "summaries": [summaries.get(u, {"firebaseUid": u}) for u in user_pair],
         "createdAt": now,
-    })
+        "lastMessage": None,
+        "lastMessageAt": None,
+        "lastActivityAt": now,
+    }
+
+
+async def create_match(user_pair: list, now: str) -> Optional[bool]:
+    """Idempotently create the match for a sorted user pair.
+
+    True if this call created it, False if it already existed, and None
+    (nothing written) if either user no longer exists or is deleted.
+    """
+    summaries = await fetch_match_summaries(user_pair, live_only=True)
+    if len(summaries) < len(user_pair):
+        return None
+    try:
+        result = await matches_col.update_one(
+            {"users": user_pair},
+            {"$setOnInsert": new_match_fields(user_pair, summaries, now)},
+            upsert=True,
+        )
+    except DuplicateKeyError:
+        return False  # a concurrent request created it first
+    return result.upserted_id is not None
+
+
+@app.post("/api/swipes/pass")
+async def pass_user(request: Request, data: dict):
+    """Skip a candidate: they are added to the seen-set and no longer shown in discover"""
+    uid = get_uid(request)
+    to_user_id = data.get("toUserId")
+    if not to_user_id:
+        raise HTTPException(400, "toUserId required")
+    if uid == to_user_id:
+        raise HTTPException(400, "Cannot pass on yourself")
+    await seen_sets.add(uid, [to_user_id])
+    deck_worker.remove_candidates(uid, [to_user_id])
+    return {"message": "Passed"}
+
+
+@app.post("/api/swipes/sync")
+async def sync_swipes(request: Request, data: dict):
+    """Apply a queue of offline swipes in one request.
+
+    Body: {"swipes": [{"toUserId": ..., "action": "like" | "pass"}, ...]}.
+    Repeated targets keep their last swipe. All likes are written with one
+    bulk_write, and mutual likes are detected with one query. The matches
+    are then created in bulk. The call costs at most five round trips
+    however many swipes it carries. Each swipe gets an outcome: liked,
+    already_liked, matched, passed, duplicate, not_found (the target does
+    not exist or is deleted) or invalid.
+    """
+    uid = get_uid(request)
+    swipes = data.get("swipes")
+    if not isinstance(swipes, list):
+        raise HTTPException(400, "swipes must be a list")
+    if len(swipes) > SWIPE_SYNC_MAX_ITEMS:
+        raise HTTPException(400, f"At most {SWIPE_SYNC_MAX_ITEMS} swipes per sync")
+
+    results = []
+    latest = {}  # target -> index of its last swipe
+    for i, swipe in enumerate(swipes):
+        target = swipe.get("toUserId") if isinstance(swipe, dict) else None
+        action = swipe.get("action") if isinstance(swipe, dict) else None
+        results.append({"toUserId": target, "action": action, "outcome": "invalid"})
+        if not isinstance(target, str) or not target or target == uid or action not in ("like", "pass"):
+            continue
+        if target in latest:
+            results[latest[target]]["outcome"] = "duplicate"
+        latest[target] = i
+        results[i]["outcome"] = None
+
+    # Swipes by or on missing or deleted users would leave orphaned likes behind
+    found = await users_col.find(
+        {"firebaseUid": {"$in": [uid, *latest]}, **NOT_DELETED}, {"_id": 0, "firebaseUid": 1}
+    ).to_list(len(latest) + 1)
+    existing = {u["firebaseUid"] for u in found}
+    if uid not in existing:
+        raise HTTPException(404, "User not found")
+    for target in set(latest) - existing:
+        results[latest.pop(target)]["outcome"] = "not_found"
 
-    # Check mutual like
-    mutual = await likes_col.find_one({"fromUserId": to_user_id, "toUserId": uid})
+    liked = [t for t, i in latest.items() if results[i]["action"] == "like"]
+    passed = [t for t, i in latest.items() if results[i]["action"] == "pass"]
+    for target in passed:
+        results[latest[target]]["outcome"] = "passed"
+
+    now = datetime.now(timezone.utc).isoformat()
+    new_likes = set()
+    if liked:
+        try:
+            write = await likes_col.bulk_write([
+                UpdateOne({"fromUserId": uid, "toUserId": t}, {"$setOnInsert": {"createdAt": now}}, upsert=True)
+                for t in liked
+            ], ordered=False)
+            upserted = write.upserted_ids
+        except BulkWriteError as e:
+            # Duplicate keys are likes a concurrent request inserted first
+            upserted = {u["index"]: u["_id"] for u in e.details.get("upserted", [])}
+        new_likes = {liked[i] for i in upserted}
+        for target in liked:
+            results[latest[target]]["outcome"] = "liked" if target in new_likes else "already_liked"
+
+    # Likes are written before checking for reciprocals, as in like_user, so
+    # two users syncing at the same moment still match
+    async def find_mutual():
+        if not new_likes:
+            return []
+        return await likes_col.find(
+            {"fromUserId": {"$in": sorted(new_likes)}, "toUserId": uid}, {"_id": 0, "fromUserId": 1}
+        ).to_list(len(new_likes))
+
+    mutual_likes, _ = await asyncio.gather(find_mutual(), seen_sets.add(uid, liked + passed))
+    mutual = sorted({like["fromUserId"] for like in mutual_likes})
+
+    created = 0
+    removed_likes = 0
     if mutual:
-        user_pair = sorted([uid, to_user_id])
-        existing_match = await matches_col.find_one({"users": user_pair})
-        if not existing_match:
-            await matches_col.insert_one({
-                "users": user_pair,
-                "createdAt": now,
-                "lastMessage": None,
-                "lastMessageAt": None,
-            })
-        await likes_col.delete_many({
-            "$or": [
-                {"fromUserId": uid, "toUserId": to_user_id},
-                {"fromUserId": to_user_id, "toUserId": uid},
-            ]
-        })
-        return {"message": "It's a match!", "matched": True}
+        summaries = await fetch_match_summaries([uid, *mutual], live_only=True)
+        # Users deleted since the existence check are not matched
+        mutual = [other for other in mutual if other in summaries] if uid in summaries else []
+    if mutual:
+        pairs = [sorted([uid, other]) for other in mutual]
+        match_ops = [
+            UpdateOne({"users": pair}, {"$setOnInsert": new_match_fields(pair, summaries, now)}, upsert=True)
+            for pair in pairs
+        ]
+
+        async def write_matches():
+            try:
+                return (await matches_col.bulk_write(match_ops, ordered=False)).upserted_count
+            except BulkWriteError as e:
+                return e.details.get("nUpserted", 0)
+
+        created, cleared = await asyncio.gather(
+            write_matches(),
+            likes_col.delete_many({"$or": [
+                {"fromUserId": uid, "toUserId": {"$in": mutual}},
+                {"fromUserId": {"$in": mutual}, "toUserId": uid},
+            ]}),
+        )
+        removed_likes = cleared.deleted_count
+        for other in mutual:
+            results[latest[other]]["outcome"] = "matched"
+
+    if liked or passed:
+        deck_worker.remove_candidates(uid, liked + passed)
+    stats_buffer.record(
+        totals={"likes": len(new_likes) - removed_likes, "matches": created},
+        events={"likes": len(new_likes), "matches": created},
+    )
 
-    return {"message": "Like sent", "matched": False}
+    counts = defaultdict(int)
+    for result in results:
+        counts[result["outcome"]] += 1
+    return {"results": results, "matches": mutual, "counts": dict(counts)}
 
 
 @app.delete("/api/likes/{to_user_id}")
 async def unlike_user(request: Request, to_user_id: str):
     uid = get_uid(request)
     result = await likes_col.delete_one({"fromUserId": uid, "toUserId": to_user_id})
+    stats_buffer.record(totals={"likes": -result.deleted_count})
     return {"message": "Unliked" if result.deleted_count else "Like not found"}
 
 
-@app.get("/api/likes/received")
-async def get_received_likes(request: Request):
+@app.get("/api/likes/received", response_class=ORJSONResponse)
+async def get_received_likes(
+    request: Request,
+    response: Response,
+    limit: int = Query(default=50, ge=1, le=200),
+    cursor: Optional[str] = None,
+    fields: Optional[str] = None,
+):
+    """Likes received, newest first; the next page's token is in X-Next-Cursor"""
     uid = get_uid(request)
-    likes = await likes_col.find({"toUserId": uid}, {"_id": 0}).to_list(100)
+    likes = await fetch_keyset_page(likes_col, {"toUserId": uid}, "createdAt", limit, cursor, response)
+
+    # Only the page's senders need checking against existing matches
+    from_ids = [like["fromUserId"] for like in likes]
+    my_matches = await matches_col.find(
+        {"$and": [{"users": uid}, {"users": {"$in": from_ids}}]}, {"_id": 0, "users": 1}
+    ).to_list(len(from_ids))
 
     matched_user_ids = set()
-    my_matches = await matches_col.find({"users": uid}, {"_id": 0}).to_list(100)
     for m in my_matches:
         for u in m.get("users", []):
             if u != uid:
                 matched_user_ids.add(u)
 
+    likes = [like for like in likes if like["fromUserId"] not in matched_user_ids]
+    cards = await fetch_user_cards((like["fromUserId"] for like in likes), user_projection("card", fields))
+
     result = []
     for like in likes:
-        from_id = like["fromUserId"]
-        if from_id in matched_user_ids:
-            continue
-        user = await users_col.find_one({"firebaseUid": from_id}, {"_id": 0})
+        user = cards.get(like["fromUserId"])
         if user:
             result.append({**user, "likedAt": like.get("createdAt")})
 
-    return result
+    return json_list_response(result, response)
 
 
 @app.get("/api/likes/sent")
-async def get_sent_likes(request: Request):
+async def get_sent_likes(
+    request: Request,
+    response: Response,
+    limit: int = Query(default=50, ge=1, le=200),
+    cursor: Optional[str] = None,
+):
     uid = get_uid(request)
-    likes = await likes_col.find({"fromUserId": uid}, {"_id": 0}).to_list(100)
+    likes = await fetch_keyset_page(likes_col, {"fromUserId": uid}, "createdAt", limit, cursor, response)
     return [l["toUserId"] for l in likes]
 
 
 # ---------- MATCHES ----------
-@app.get("/api/matches")
-async def get_matches(request: Request):
+# Participant fields embedded on match documents so the inbox needs no join
+MATCH_SUMMARY_FIELDS = ("name", "age", "profileImage", "location", "status")
+MATCH_SUMMARY_PROJECTION = {"_id": 0, "firebaseUid": 1, "deletedAt": 1, **{f: 1 for f in MATCH_SUMMARY_FIELDS}}
+
+
+def match_summary(user: dict) -> dict:
+    """Embedded summary of a user; ``deleted`` comes from the tombstone, which clients cannot set"""
+    summary = {k: v for k, v in user.items() if k != "deletedAt"}
+    summary["deleted"] = "deletedAt" in user
+    return summary
+
+
+async def fetch_match_summaries(uids: list, live_only: bool = False) -> dict:
+    """Summaries for many users in a single round trip, keyed by firebaseUid"""
+    query = {"firebaseUid": {"$in": uids}, **(NOT_DELETED if live_only else {})}
+    users = await users_col.find(query, MATCH_SUMMARY_PROJECTION).to_list(len(uids))
+    return {u["firebaseUid"]: match_summary(u) for u in users}
+
+
+class MatchSummaryWorker(QueueWorker):
+    """Background task keeping embedded match summaries fresh.
+
+    Profile edits enqueue a refresh (de-duplicated per user) that rewrites
+    the user's entry in every match with one update_many; legacy matches
+    without summaries are backfilled the first time they are listed.
+    """
+
+    label = "Match summary worker"
+
+    def refresh(self, uid: str):
+        """Copy the user's current summary fields into all of their matches"""
+        self.enqueue_once("refresh", uid)
+
+    def backfill(self, match_id, summaries: list):
+        """Store summaries on a match created before they were embedded"""
+        self.enqueue("backfill", match_id, summaries)
+
+    async def handle(self, op: str, key, summaries):
+        if op == "refresh":
+            await self._refresh(key)
+        elif op == "backfill":
+            await matches_col.update_one(
+                {"_id": key, "summaries": {"$exists": False}}, {"$set": {"summaries": summaries}}
+            )
+
+    async def _refresh(self, uid: str):
+        # Read the profile when the op runs so coalesced edits converge on the latest values
+        user = await users_col.find_one({"firebaseUid": uid}, MATCH_SUMMARY_PROJECTION)
+        if not user:
+            return
+        summary = match_summary(user)
+        await matches_col.update_many(
+            {"users": uid, "summaries.firebaseUid": uid},
+            {"$set": {f"summaries.$[s].{f}": summary.get(f) for f in (*MATCH_SUMMARY_FIELDS, "deleted")}},
+            array_filters=[{"s.firebaseUid": uid}],
+        )
+
+
+match_summary_worker = MatchSummaryWorker()
+
+
+@app.get("/api/matches", response_class=ORJSONResponse)
+async def get_matches(
+    request: Request,
+    response: Response,
+    limit: int = Query(default=50, ge=1, le=200),
+    cursor: Optional[str] = None,
+    fields: Optional[str] = None,
+):
+    """Matches by most recent activity; the next page's token is in X-Next-Cursor.
+
+    ``matchedUser`` is the summary embedded on the match, so the page is a
+    single indexed query. Passing ``fields`` joins the full card instead.
+    """
     uid = get_uid(request)
-    my_matches = await matches_col.find({"users": uid}, {"_id": 0}).to_list(100)
+    my_matches = await fetch_keyset_page(matches_col, {"users": uid}, "lastActivityAt", limit, cursor, response)
 
-    result = []
+    pairs = []
     for m in my_matches:
         other_uid = [u for u in m.get("users", []) if u != uid]
         if other_uid:
-            other_user = await users_col.find_one({"firebaseUid": other_uid[0]}, {"_id": 0})
-            if other_user:
-                result.append({
-                    "matchedUser": other_user,
-                    "createdAt": m.get("createdAt"),
-                    "lastMessage": m.get("lastMessage"),
-                    "lastMessageAt": m.get("lastMessageAt"),
-                })
-    return result
+            pairs.append((m, other_uid[0]))
+
+    if fields:
+        cards = await fetch_user_cards((other for _, other in pairs), user_projection("card", fields))
+    else:
+        cards = {}
+        for m, other in pairs:
+            summary = next((s for s in m.get("summaries") or () if s.get("firebaseUid") == other), None)
+            if summary:
+                cards[other] = summary
+        missing = [(m, other) for m, other in pairs if other not in cards]
+        if missing:
+            # Legacy matches: join once now and store the summaries for next time
+            fetched = await fetch_match_summaries(list({u for m, _ in missing for u in m["users"]}))
+            for m, other in missing:
+                if other in fetched:
+                    cards[other] = fetched[other]
+                    match_summary_worker.backfill(
+                        m["_id"], [fetched.get(u, {"firebaseUid": u}) for u in m["users"]]
+                    )
+
+    result = []
+    for m, other in pairs:
+        other_user = cards.get(other)
+        if other_user and not other_user.get("deleted"):
+            result.append({
+                "matchId": str(m["_id"]),
+                "matchedUser": {k: v for k, v in other_user.items() if k != "deleted"},
+                "createdAt": m.get("createdAt"),
+                "lastMessage": m.get("lastMessage"),
+                "lastMessageAt": m.get("lastMessageAt"),
+            })
+    return json_list_response(result, response)
+
+
+# ---------- MESSAGING ----------
+message_broker = InProcessBroker()
+last_message_writer = LastMessageWriter(matches_col, MESSAGE_PREVIEW_FLUSH_INTERVAL)
+metrics_registry.gauge_callback(
+    "websocket_connections", "Open chat WebSocket connections on this worker.",
+    lambda: message_broker.connection_count(),
+)
+
+
+async def get_match_for(uid: str, match_id: str):
+    """The match with this id if uid is one of its participants, else None"""
+    try:
+        oid = ObjectId(match_id)
+    except (InvalidId, TypeError):
+        return None
+    return await matches_col.find_one({"_id": oid, "users": uid}, {"users": 1})
+
+
+def serialize_message(message: dict) -> dict:
+    return {
+        "id": str(message["_id"]),
+        "matchId": message["matchId"],
+        "senderId": message["senderId"],
+        "text": message["text"],
+        "createdAt": message["createdAt"],
+    }
+
+
+async def send_message(match_id: str, uid: str, text) -> dict:
+    """Store a message, fan it out to connected participants and queue the match preview"""
+    if not isinstance(text, str) or not text.strip():
+        raise HTTPException(400, "text required")
+    if len(text) > MESSAGE_MAX_LENGTH:
+        raise HTTPException(400, f"Message exceeds {MESSAGE_MAX_LENGTH} characters")
+
+    message = {
+        "matchId": match_id,
+        "senderId": uid,
+        "text": text,
+        "createdAt": datetime.now(timezone.utc).isoformat(),
+    }
+    await messages_col.insert_one(message)
+    payload = serialize_message(message)
+    await message_broker.publish(f"match:{match_id}", json.dumps({"type": "message", "message": payload}))
+    last_message_writer.record(match_id, text, message["createdAt"])
+    return payload
+
+
+@app.get("/api/matches/{match_id}/messages", response_class=ORJSONResponse)
+async def get_messages(
+    request: Request,
+    response: Response,
+    match_id: str,
+    limit: int = Query(default=50, ge=1, le=200),
+    cursor: Optional[str] = None,
+):
+    """Conversation history, newest first; the next page's token is in X-Next-Cursor"""
+    uid = get_uid(request)
+    if not await get_match_for(uid, match_id):
+        raise HTTPException(404, "Match not found")
+    messages = await fetch_keyset_page(messages_col, {"matchId": match_id}, "createdAt", limit, cursor, response)
+    return json_list_response([serialize_message(m) for m in messages], response)
+
+
+@app.post("/api/matches/{match_id}/messages")
+async def post_message(request: Request, match_id: str, data: dict):
+    uid = get_uid(request)
+    if not await get_match_for(uid, match_id):
+        raise HTTPException(404, "Match not found")
+    return {"message": await send_message(match_id, uid, data.get("text"))}
+
+
+@app.websocket("/api/ws/matches/{match_id}")
+async def match_socket(websocket: WebSocket, match_id: str):
+    """Live conversation channel for one match.
+
+    The participant is identified by the x-firebase-uid header or, for
+    browsers that cannot set headers on sockets, the ``uid`` query param.
+    Clients send {"type": "message", "text": ...} or {"type": "typing",
+    "isTyping": bool} as text frames and receive the same event types from
+    both sides; a binary frame closes the socket with 1003.
+    """
+    uid = websocket.headers.get("x-firebase-uid") or websocket.query_params.get("uid")
+    if not uid or not await get_match_for(uid, match_id):
+        await websocket.close(code=4403)
+        return
+    await websocket.accept()
+
+    channel = f"match:{match_id}"
+    connection = Connection(websocket, uid, WEBSOCKET_QUEUE_SIZE)
+    message_broker.subscribe(channel, connection)
+    sender = asyncio.create_task(connection.sender())
+    try:
+        while True:
+            frame = await websocket.receive()
+            if frame["type"] == "websocket.disconnect":
+                break
+            if frame.get("text") is None:
+                await websocket.close(code=1003)  # unsupported data: the protocol is JSON text frames
+                break
+            try:
+                event = json.loads(frame["text"])
+            except ValueError:
+                await websocket.send_text(json.dumps({"type": "error", "detail": "Invalid JSON"}))
+                continue
+            kind = event.get("type") if isinstance(event, dict) else None
+            if kind == "message":
+                try:
+                    await send_message(match_id, uid, event.get("text"))
+                except HTTPException as e:
+                    await websocket.send_text(json.dumps({"type": "error", "detail": e.detail}))
+            elif kind == "typing":
+                typing = {"type": "typing", "userId": uid, "isTyping": bool(event.get("isTyping"))}
+                await message_broker.publish(channel, json.dumps(typing), droppable=True)
+    except (WebSocketDisconnect, RuntimeError):
+        pass  # RuntimeError: the sender closed a slow consumer's socket
+    finally:
+        message_broker.unsubscribe(channel, connection)
+        sender.cancel()
 
 
 # ---------- AI BIO GENERATION ----------
-@app.post("/api/ai/generate-bio")
-async def generate_bio(data: dict):
-    if not EMERGENT_LLM_KEY:
-        raise HTTPException(500, "LLM key not configured")
+BIO_CACHE_TTL = float(os.environ.get("BIO_CACHE_TTL", "86400"))
+BIO_CACHE_SIZE = int(os.environ.get("BIO_CACHE_SIZE", "2048"))
+BIO_LLM_CONCURRENCY = int(os.environ.get("BIO_LLM_CONCURRENCY", "8"))
+
+BIO_SYSTEM_MESSAGE = "You are a professional relationship coach specializing in traditional courtship and marriage-minded dating. Always return valid JSON only."
+BIO_STREAM_SYSTEM_MESSAGE = "You are a professional relationship coach specializing in traditional courtship and marriage-minded dating. Return only the bio text."
+
+
+class EmergentBioLLM:
+    """Bio generator backed by Gemini through the Emergent LLM integration.
+
+    Any object with the same ``available``/``complete``/``stream`` interface
+    can be assigned to ``bio_llm``, e.g. a local fake in tests.
+    """
+
+    @property
+    def available(self) -> bool:
+        return bool(EMERGENT_LLM_KEY)
+
+    async def complete(self, system_message: str, prompt: str) -> str:
+        from emergentintegrations.llm.chat import LlmChat, UserMessage
+
+        chat = LlmChat(
+            api_key=EMERGENT_LLM_KEY,
+            session_id=f"bio-gen-{uuid.uuid4()}",
+            system_message=system_message,
+        )
+        chat.with_model("gemini", "gemini-2.5-flash")
+        return await chat.send_message(UserMessage(text=prompt))
+
+    async def stream(self, system_message: str, prompt: str):
+        # The integration only exposes whole-message replies, so this yields once
+        yield await self.complete(system_message, prompt)
 
-    name = data.get("name", "")
-    age = data.get("age", "")
-    faith = data.get("faith", "")
-    hobbies = data.get("hobbies", "")
-    values = data.get("values", "")
-    looking_for = data.get("lookingFor", "")
 
-    prompt = f"""Create a dating profile bio for a user named {name}, age {age}.
+bio_llm = EmergentBioLLM()
+bio_cache = TTLCache(BIO_CACHE_SIZE, BIO_CACHE_TTL)
+bio_semaphore = asyncio.Semaphore(BIO_LLM_CONCURRENCY)
+
+
+class BioGenerationUnavailable(Exception):
+    pass
+
+
+def _normalize_bio_field(value) -> str:
+    if isinstance(value, (list, tuple)):
+        return ", ".join(sorted(_normalize_bio_field(v) for v in value))
+    return " ".join(str(value).split()).casefold()
+
+
+def bio_fields(data: dict) -> dict:
+    return {
+        "name": data.get("name", ""),
+        "age": data.get("age", ""),
+        "faith": data.get("faith", ""),
+        "hobbies": data.get("hobbies", ""),
+        "values": data.get("values", ""),
+        "lookingFor": data.get("lookingFor", ""),
+    }
+
+
+def bio_cache_key(fields: dict):
+    return tuple(_normalize_bio_field(fields[k]) for k in ("name", "age", "faith", "hobbies", "values", "lookingFor"))
+
+
+def bio_prompt(fields: dict, output: str) -> str:
+    return f"""Create a dating profile bio for a user named {fields["name"]}, age {fields["age"]}.
 
 User Details:
-- Faith/Denomination: {faith}
-- Hobbies: {hobbies}
-- Core Values: {values}
-- Looking for: {looking_for}
+- Faith/Denomination: {fields["faith"]}
+- Hobbies: {fields["hobbies"]}
+- Core Values: {fields["values"]}
+- Looking for: {fields["lookingFor"]}
 
 Context: This is for an app called "Virgins", exclusively for people with traditional values who are saving sex for marriage.
 
@@ -613,109 +2387,311 @@ Requirements:
 2. Emphasize commitment to traditional values and waiting for marriage.
 3. If faith is provided, weave it naturally.
 4. Avoid slang, hookup language, or superficiality.
-5. Return ONLY valid JSON with two fields: "bio" (the generated bio text, max 200 words) and "advice" (a short encouraging piece of relationship advice, max 50 words)."""
+5. {output}"""
+
+
+BIO_JSON_OUTPUT = 'Return ONLY valid JSON with two fields: "bio" (the generated bio text, max 200 words) and "advice" (a short encouraging piece of relationship advice, max 50 words).'
+BIO_TEXT_OUTPUT = "Return ONLY the bio text (max 200 words), with no JSON, headings or quotes."
+
+
+def fallback_bio(fields: dict) -> dict:
+    return {
+        "bio": f"{fields['name']} is a {fields['age']}-year-old who values {fields['values']}. Committed to traditional courtship and saving intimacy for marriage. Enjoys {fields['hobbies']} and is looking for {fields['lookingFor']}.",
+        "advice": "Stay true to your values. The right person will honor your commitment.",
+    }
+
+
+async def _complete_bio(fields: dict) -> dict:
+    # Fail fast instead of queueing behind slow LLM calls when saturated
+    if bio_semaphore.locked():
+        raise BioGenerationUnavailable("LLM concurrency limit reached")
+    async with bio_semaphore:
+        response = await bio_llm.complete(BIO_SYSTEM_MESSAGE, bio_prompt(fields, BIO_JSON_OUTPUT))
+    cleaned = response.strip()
+    if cleaned.startswith("```"):
+        cleaned = cleaned.split("\n", 1)[-1].rsplit("```", 1)[0]
+    return bio_result(json.loads(cleaned), fields)
+
+
+def bio_result(parsed, fields: dict) -> dict:
+    """Shape a parsed LLM reply as {"bio", "advice"}, the only form cached. Raises ValueError."""
+    if isinstance(parsed, str):
+        parsed = {"bio": parsed}
+    if not isinstance(parsed, dict) or not isinstance(parsed.get("bio"), str) or not parsed["bio"].strip():
+        raise ValueError("LLM reply has no bio")
+    advice = parsed.get("advice")
+    if not isinstance(advice, str) or not advice.strip():
+        advice = fallback_bio(fields)["advice"]
+    return {"bio": parsed["bio"], "advice": advice}
+
+
+@app.post("/api/ai/generate-bio")
+async def generate_bio(data: dict):
+    """Generate a profile bio, served from cache for repeated inputs.
+
+    Identical concurrent requests share one LLM call, and when
+    BIO_LLM_CONCURRENCY calls are already running the template bio is
+    returned immediately.
+    """
+    if not bio_llm.available:
+        raise HTTPException(500, "LLM key not configured")
 
+    fields = bio_fields(data)
     try:
-        chat = LlmChat(
-            api_key=EMERGENT_LLM_KEY,
-            session_id=f"bio-gen-{uuid.uuid4()}",
-            system_message="You are a professional relationship coach specializing in traditional courtship and marriage-minded dating. Always return valid JSON only.",
-        )
-        chat.with_model("gemini", "gemini-2.5-flash")
+        return await bio_cache.get_or_load(bio_cache_key(fields), lambda: _complete_bio(fields))
+    except Exception:
+        return fallback_bio(fields)
 
-        msg = UserMessage(text=prompt)
-        response = await chat.send_message(msg)
 
-        import json
-        cleaned = response.strip()
-        if cleaned.startswith("```"):
-            cleaned = cleaned.split("\n", 1)[-1].rsplit("```", 1)[0]
-        result = json.loads(cleaned)
-        return result
-    except Exception as e:
-        return {
-            "bio": f"{name} is a {age}-year-old who values {values}. Committed to traditional courtship and saving intimacy for marriage. Enjoys {hobbies} and is looking for {looking_for}.",
-            "advice": "Stay true to your values. The right person will honor your commitment.",
-        }
+@app.post("/api/ai/generate-bio/stream")
+async def generate_bio_stream(data: dict):
+    """Stream the generated bio as plain text while the LLM produces it"""
+    if not bio_llm.available:
+        raise HTTPException(500, "LLM key not configured")
+
+    fields = bio_fields(data)
+    cached = bio_cache.get(bio_cache_key(fields))
+
+    async def chunks():
+        if cached:
+            yield cached["bio"]
+            return
+        if bio_semaphore.locked():
+            yield fallback_bio(fields)["bio"]
+            return
+        sent = False
+        try:
+            async with bio_semaphore:
+                async for chunk in bio_llm.stream(BIO_STREAM_SYSTEM_MESSAGE, bio_prompt(fields, BIO_TEXT_OUTPUT)):
+                    if chunk:
+                        sent = True
+                        yield chunk
+        except Exception:
+            logger.exception("Streaming bio generation failed")
+            if not sent:
+                yield fallback_bio(fields)["bio"]
+
+    return StreamingResponse(chunks(), media_type="text/plain; charset=utf-8")
 
 
 # ---------- SEED / ADMIN ----------
 @app.post("/api/seed")
 async def seed_data():
-    await users_col.delete_many({"firebaseUid": {"$regex": "^mock_"}})
+    removed = await users_col.delete_many({"firebaseUid": {"$regex": "^mock_"}})
     now = datetime.now(timezone.utc).isoformat()
-    for user in MOCK_USERS:
-        user_copy = {**user, "createdAt": now}
-        try:
-            await users_col.insert_one(user_copy)
-        except Exception:
-            pass
+    try:
+        result = await users_col.insert_many([{**user, "createdAt": now, "covenantCodes": encode_profile(user)} for user in MOCK_USERS], ordered=False)
+        inserted = len(result.inserted_ids)
+    except BulkWriteError as e:
+        inserted = e.details.get("nInserted", 0)
+    stats_buffer.record(totals={"users": inserted - removed.deleted_count})
     return {"message": f"Seeded {len(MOCK_USERS)} mock users"}
 
 
+SYNTHETIC_SEED_API_MAX_USERS = int(os.environ.get("SYNTHETIC_SEED_API_MAX_USERS", "200000"))
+
+
+@app.post("/api/admin/seed/synthetic")
+async def seed_synthetic_population(data: dict):
+    """Bulk-load a synthetic population (see seeding.py; use its CLI for millions of users)"""
+    users = int(data.get("users", 1000))
+    if users < 0 or users > SYNTHETIC_SEED_API_MAX_USERS:
+        raise HTTPException(400, f"users must be between 0 and {SYNTHETIC_SEED_API_MAX_USERS}")
+
+    cleared = None
+    if data.get("clear"):
+        cleared = await clear_population(db)
+        stats_buffer.record(totals={k: -v for k, v in cleared.items()})
+    report = await seed_population(
+        db,
+        users=users,
+        likes_per_user=int(data.get("likesPerUser", 5)),
+        match_rate=float(data.get("matchRate", 0.15)),
+        batch_size=int(data.get("batchSize", 5000)),
+        seed=data.get("seed"),
+    )
+    stats_buffer.record(totals={k: report[k] for k in ("users", "likes", "matches")})
+    return {"message": f"Seeded {report['users']} synthetic users", "cleared": cleared, "report": report}
+
+
+@app.delete("/api/admin/seed/synthetic")
+async def clear_synthetic_population():
+    deleted = await clear_population(db, SYNTHETIC_PREFIX)
+    stats_buffer.record(totals={k: -v for k, v in deleted.items()})
+    return {"message": "Synthetic population removed", "deleted": deleted}
+
+
 @app.get("/api/admin/stats")
 async def admin_stats():
-    user_count = await users_col.count_documents({})
-    like_count = await likes_col.count_documents({})
-    match_count = await matches_col.count_documents({})
+    """Running totals maintained by the write paths; a single document read"""
+    totals = await stats_col.find_one({"_id": "totals"}) or {}
+    pending = stats_buffer.pending_totals()
+    return {
+        "totalUsers": totals.get("users", 0) + pending.get("users", 0),
+        "totalLikes": totals.get("likes", 0) + pending.get("likes", 0),
+        "totalMatches": totals.get("matches", 0) + pending.get("matches", 0),
+        "passwordHashing": password_hasher.stats(),
+    }
+
+
+@app.get("/api/admin/startup")
+async def admin_startup():
+    """How long this worker took to become ready, and which lazy integrations are loaded so far"""
+    lazy = {
+        "passlib": "passlib.context",
+        "httpx": "httpx",
+        "llm": "emergentintegrations.llm.chat",
+        "stripe": "emergentintegrations.payments.stripe.checkout",
+    }
+    return {**startup_report, "loaded": {name: module in sys.modules for name, module in lazy.items()}}
+
+
+@app.get("/api/admin/stats/trends")
+async def admin_stats_trends(
+    period: str = Query(default="day", pattern="^(hour|day)$"),
+    limit: int = Query(default=30, ge=1, le=720),
+):
+    """Signups, likes and matches per hour or day, newest bucket first"""
+    buckets = await stats_col.find(
+        {"period": period}, {"_id": 0, "period": 0}
+    ).sort("bucket", -1).limit(limit).to_list(limit)
     return {
-        "totalUsers": user_count,
-        "totalLikes": like_count,
-        "totalMatches": match_count,
+        "period": period,
+        "buckets": [
+            {"bucket": b["bucket"], "signups": b.get("signups", 0), "likes": b.get("likes", 0), "matches": b.get("matches", 0)}
+            for b in buckets
+        ],
     }
 
 
-# ---------- GEOLOCATION HELPERS ----------
-def calculate_distance(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
-    """Calculate distance between two coordinates in kilometers using Haversine formula"""
-    R = 6371  # Earth's radius in kilometers
-    dlat = radians(lat2 - lat1)
-    dlon = radians(lon2 - lon1)
-    a = sin(dlat / 2) ** 2 + cos(radians(lat1)) * cos(radians(lat2)) * sin(dlon / 2) ** 2
-    c = 2 * atan2(sqrt(a), sqrt(1 - a))
-    return R * c
+@app.post("/api/admin/stats/reconcile")
+async def admin_stats_reconcile():
+    """Recount totals from the collections, e.g. after manual data changes"""
+    await stats_buffer.flush()
+    return {"message": "Totals reconciled", "totals": await reconcile_stats_totals()}
+
+
+@app.get("/api/admin/weight-profiles")
+async def list_weight_profiles(uid: Optional[str] = None):
+    """Weight profiles in service on this worker with their traffic shares, and optionally a user's profile"""
+    result = {"profiles": weight_profiles.summary()}
+    if uid:
+        result["assigned"] = weight_profiles.for_user(uid).name
+    return result
+
+
+@app.put("/api/admin/weight-profiles/{name}")
+async def save_weight_profile(name: str, data: dict):
+    """Create or replace a weight profile; every worker picks it up on its next reload"""
+    share = data.get("share", 0)
+    if isinstance(share, bool) or not isinstance(share, int) or not 0 <= share <= 100:
+        raise HTTPException(400, "share must be an integer between 0 and 100")
+    try:
+        compile_weights(name, data.get("weights"))
+    except ValueError as e:
+        raise HTTPException(400, str(e))
+    if share and name != DEFAULT_PROFILE:
+        others = await weight_profiles_col.find(
+            {"_id": {"$nin": [name, DEFAULT_PROFILE]}}, {"share": 1}
+        ).to_list(None)
+        allocated = sum(doc.get("share", 0) for doc in others)
+        if allocated + share > 100:
+            raise HTTPException(400, f"Only {100 - allocated}% of traffic is unassigned")
+
+    await weight_profiles_col.replace_one(
+        {"_id": name},
+        {"weights": data.get("weights") or {}, "share": share, "updatedAt": datetime.now(timezone.utc).isoformat()},
+        upsert=True,
+    )
+    await weight_profiles.reload()
+    return {"message": f"Weight profile {name} saved", "profiles": weight_profiles.summary()}
+
+
+@app.delete("/api/admin/weight-profiles/{name}")
+async def delete_weight_profile(name: str):
+    result = await weight_profiles_col.delete_one({"_id": name})
+    if result.deleted_count == 0:
+        raise HTTPException(404, "Weight profile not found")
+    await weight_profiles.reload()
+    return {"message": f"Weight profile {name} deleted", "profiles": weight_profiles.summary()}
 
 
 # ---------- NEARBY / GEOLOCATION ----------
-@app.post("/api/users/nearby")
+NEARBY_BLEND_POOL = int(os.environ.get("NEARBY_BLEND_POOL", "1000"))
+
+
+@app.post("/api/users/nearby", response_class=ORJSONResponse)
 async def get_nearby_users(request: Request, data: dict):
-    """Find nearby users using MongoDB geospatial queries"""
+    """Find nearby users with a single $geoNear aggregation.
+
+    MongoDB computes each user's distance, and the optional discover filters
+    (gender, minAge, maxAge) are applied inside the same query. With
+    ``rank: "blend"`` the closest candidates are re-ranked by a mix of
+    covenant score and proximity, weighted by ``distanceWeight`` (0-1).
+    ``view``/``fields`` select card projections as in discover.
+    """
     uid = get_uid(request)
     latitude = data.get("latitude")
     longitude = data.get("longitude")
     max_distance = data.get("maxDistance", 50000)  # Default 50km in meters
     limit = data.get("limit", 20)
+    rank = data.get("rank", "distance")
 
     if latitude is None or longitude is None:
         raise HTTPException(400, "latitude and longitude required")
+    if rank not in ("distance", "blend"):
+        raise HTTPException(400, "rank must be 'distance' or 'blend'")
+    computed = ("distance", "score", "blendedScore")
+    if rank == "blend":
+        computed += ("covenantCodes",)
+    projection = user_projection(data.get("view", "full"), data.get("fields"), computed=computed)
+
+    query = {"firebaseUid": {"$ne": uid}, **NOT_DELETED}
+    if data.get("gender"):
+        query["gender"] = data["gender"]
+    if data.get("minAge") is not None or data.get("maxAge") is not None:
+        query["age"] = {"$gte": data.get("minAge", 18), "$lte": data.get("maxAge", 99)}
+
+    pipeline = [{"$geoNear": {
+        "near": {"type": "Point", "coordinates": [longitude, latitude]},
+        "distanceField": "distance",
+        "maxDistance": max_distance,
+        "query": query,
+        "spherical": True,
+    }}]
+
+    current_user = weights = None
+    if rank == "blend":
+        distance_weight = min(max(float(data.get("distanceWeight", 0.3)), 0.0), 1.0)
+        current_user = await users_col.find_one({"firebaseUid": uid}, {"_id": 0})
+        weights = weight_profiles.for_user(uid)
+        proximity = {"$multiply": [
+            {"$subtract": [1, {"$divide": ["$distance", max(max_distance, 1)]}]},
+            100,
+        ]}
+        pipeline += [
+            {"$limit": max(NEARBY_BLEND_POOL, limit)},
+            *covenant_score_stages(current_user, weights),
+            {"$addFields": {"blendedScore": {"$add": [
+                {"$multiply": ["$score", 1 - distance_weight]},
+                {"$multiply": [proximity, distance_weight]},
+            ]}}},
+            {"$sort": {"blendedScore": -1, "distance": 1}},
+        ]
+
+    pipeline += [
+        {"$limit": limit},
+        {"$addFields": {"distance": {"$round": [{"$divide": ["$distance", 1000]}, 1]}}},
+        {"$project": projection},
+    ]
+    nearby_users = await users_col.aggregate(pipeline).to_list(limit)
 
-    # Find users with geospatial query
-    nearby_users = await users_col.find(
-        {
-            "firebaseUid": {"$ne": uid},
-            "coordinates": {
-                "$near": {
-                    "$geometry": {
-                        "type": "Point",
-                        "coordinates": [longitude, latitude]
-                    },
-                    "$maxDistance": max_distance
-                }
-            }
-        },
-        {"_id": 0, "passwordHash": 0}
-    ).limit(limit).to_list(limit)
-
-    # Calculate distance for each user
-    for user in nearby_users:
-        if user.get("coordinates"):
-            coords = user["coordinates"]["coordinates"]
-            dist_km = calculate_distance(latitude, longitude, coords[1], coords[0])
-            user["distance"] = round(dist_km, 1)
-        else:
-            user["distance"] = None
+    if rank == "blend":
+        nearby_users = with_covenant_scores(current_user, nearby_users, weights)
+        for user in nearby_users:
+            user["blendedScore"] = round(user["blendedScore"], 1)
 
-    return nearby_users
+    return ORJSONResponse(nearby_users)
 
 
 @app.put("/api/users/me/location")
@@ -741,23 +2717,55 @@ async def update_user_location(request: Request, data: dict):
     if result.matched_count == 0:
         raise HTTPException(404, "User not found")
 
+    deck_worker.rebuild(uid)
     return {"message": "Location updated", "coordinates": coordinates}
 
 
 # ---------- GOOGLE PLACES API ----------
-@app.get("/api/venues/nearby")
-async def get_nearby_venues(
-    latitude: float = Query(...),
-    longitude: float = Query(...),
-    radius: int = Query(default=1500),
-    place_types: str = Query(default="restaurant,cafe,park,church")
-):
-    """Search for nearby date-friendly venues using Google Places API"""
-    if not GOOGLE_MAPS_API_KEY:
-        raise HTTPException(500, "Google Maps API key not configured")
+# Venue lookups are cached per map tile: nearby requests snap to the centre of
+# a VENUE_TILE_DEGREES grid cell and the radius is rounded up to a bucket, so
+# users a few blocks apart share one Places call.
+VENUE_TILE_DEGREES = float(os.environ.get("VENUE_TILE_DEGREES", "0.01"))
+VENUE_RADIUS_BUCKET = int(os.environ.get("VENUE_RADIUS_BUCKET", "500"))
+VENUE_CACHE_TTL = float(os.environ.get("VENUE_CACHE_TTL", "900"))
+VENUE_CACHE_SIZE = int(os.environ.get("VENUE_CACHE_SIZE", "4096"))
+
+venue_cache = TTLCache(VENUE_CACHE_SIZE, VENUE_CACHE_TTL)
+http_client = None
+
+
+def get_http_client():
+    """Shared pooled HTTP client for outbound API calls, created on first use"""
+    global http_client
+    if http_client is None:
+        import httpx
+
+        http_client = httpx.AsyncClient(
+            timeout=10.0,
+            limits=httpx.Limits(max_connections=100, max_keepalive_connections=20),
+        )
+    return http_client
+
+
+async def close_http_client():
+    global http_client
+    if http_client is not None:
+        await http_client.aclose()
+        http_client = None
+
+
+class VenueLookupError(Exception):
+    pass
+
+
+def venue_cache_key(latitude: float, longitude: float, radius: int, types: list):
+    tile = (round(latitude / VENUE_TILE_DEGREES), round(longitude / VENUE_TILE_DEGREES))
+    radius_bucket = max(math.ceil(radius / VENUE_RADIUS_BUCKET), 1) * VENUE_RADIUS_BUCKET
+    return tile, radius_bucket, tuple(sorted(set(types)))
+
 
-    types_list = [t.strip() for t in place_types.split(",")]
-    
+async def fetch_places(key) -> list:
+    (tile_lat, tile_lng), radius, types = key
     headers = {
         "Content-Type": "application/json",
         "X-Goog-Api-Key": GOOGLE_MAPS_API_KEY,
@@ -765,13 +2773,13 @@ async def get_nearby_venues(
     }
 
     payload = {
-        "includedTypes": types_list,
+        "includedTypes": list(types),
         "maxResultCount": 20,
         "locationRestriction": {
             "circle": {
                 "center": {
-                    "latitude": latitude,
-                    "longitude": longitude
+                    "latitude": round(tile_lat * VENUE_TILE_DEGREES, 6),
+                    "longitude": round(tile_lng * VENUE_TILE_DEGREES, 6)
                 },
                 "radius": float(radius)
             }
@@ -779,46 +2787,64 @@ async def get_nearby_venues(
         "rankPreference": "DISTANCE"
     }
 
-    async with httpx.AsyncClient() as client:
-        response = await client.post(
-            "https://places.googleapis.com/v1/places:searchNearby",
-            json=payload,
-            headers=headers,
-            timeout=10.0
-        )
+    client = get_http_client()
+    import httpx
 
-        if response.status_code != 200:
-            # Fallback to mock venues if Places API fails
-            return {
-                "places": [
-                    {"id": "1", "displayName": {"text": "Grace Fellowship Cafe"}, "formattedAddress": "123 Faith St", "location": {"latitude": latitude + 0.005, "longitude": longitude + 0.003}, "types": ["cafe"], "rating": 4.8},
-                    {"id": "2", "displayName": {"text": "Covenant Garden Park"}, "formattedAddress": "456 Peace Ave", "location": {"latitude": latitude - 0.003, "longitude": longitude + 0.007}, "types": ["park"], "rating": 4.6},
-                    {"id": "3", "displayName": {"text": "The Bethany Bistro"}, "formattedAddress": "789 Hope Blvd", "location": {"latitude": latitude + 0.008, "longitude": longitude - 0.004}, "types": ["restaurant"], "rating": 4.9},
-                ],
-                "source": "mock"
-            }
+    try:
+        response = await client.post(GOOGLE_PLACES_URL, json=payload, headers=headers)
+    except httpx.HTTPError as e:
+        raise VenueLookupError(str(e))
+    if response.status_code != 200:
+        raise VenueLookupError(f"Places API returned {response.status_code}")
+
+    data = response.json()
+    venues = []
+    for place in data.get("places", []):
+        venue = {
+            "id": place.get("id"),
+            "displayName": place.get("displayName", {}),
+            "formattedAddress": place.get("formattedAddress"),
+            "location": place.get("location", {}),
+            "types": place.get("types", []),
+            "rating": place.get("rating"),
+            "primaryType": place.get("primaryType"),
+            "websiteUri": place.get("websiteUri")
+        }
+        venues.append(venue)
+    return venues
 
-        data = response.json()
-        venues = []
-        for place in data.get("places", []):
-            venue = {
-                "id": place.get("id"),
-                "displayName": place.get("displayName", {}),
-                "formattedAddress": place.get("formattedAddress"),
-                "location": place.get("location", {}),
-                "types": place.get("types", []),
-                "rating": place.get("rating"),
-                "primaryType": place.get("primaryType"),
-                "websiteUri": place.get("websiteUri")
-            }
-            venues.append(venue)
 
-        return {"places": venues, "source": "google"}
+@app.get("/api/venues/nearby")
+async def get_nearby_venues(
+    latitude: float = Query(...),
+    longitude: float = Query(...),
+    radius: int = Query(default=1500),
+    place_types: str = Query(default="restaurant,cafe,park,church")
+):
+    """Search for nearby date-friendly venues using Google Places API"""
+    if not GOOGLE_MAPS_API_KEY:
+        raise HTTPException(500, "Google Maps API key not configured")
 
+    types_list = [t.strip() for t in place_types.split(",") if t.strip()]
+    key = venue_cache_key(latitude, longitude, radius, types_list)
+
+    try:
+        venues = await venue_cache.get_or_load(key, lambda: fetch_places(key))
+    except VenueLookupError:
+        # Fallback to mock venues if Places API fails
+        return {
+            "places": [
+                {"id": "1", "displayName": {"text": "Grace Fellowship Cafe"}, "formattedAddress": "123 Faith St", "location": {"latitude": latitude + 0.005, "longitude": longitude + 0.003}, "types": ["cafe"], "rating": 4.8},
+                {"id": "2", "displayName": {"text": "Covenant Garden Park"}, "formattedAddress": "456 Peace Ave", "location": {"latitude": latitude - 0.003, "longitude": longitude + 0.007}, "types": ["park"], "rating": 4.6},
+                {"id": "3", "displayName": {"text": "The Bethany Bistro"}, "formattedAddress": "789 Hope Blvd", "location": {"latitude": latitude + 0.008, "longitude": longitude - 0.004}, "types": ["restaurant"], "rating": 4.9},
+            ],
+            "source": "mock"
+        }
+
+    return {"places": venues, "source": "google"}
 
-# ---------- STRIPE PAYMENTS ----------
-from emergentintegrations.payments.stripe.checkout import StripeCheckout, CheckoutSessionResponse, CheckoutStatusResponse, CheckoutSessionRequest
 
+# ---------- STRIPE PAYMENTS ----------
 STRIPE_API_KEY = os.environ.get("STRIPE_API_KEY")
 
 # Define membership packages (amounts in dollars)
@@ -831,6 +2857,14 @@ MEMBERSHIP_PACKAGES = {
 payments_col = db["payment_transactions"]
 
 
+def get_stripe_checkout(request: Request):
+    """Stripe client for this request; the integration is imported on first payment call"""
+    from emergentintegrations.payments.stripe.checkout import StripeCheckout
+
+    webhook_url = f"{str(request.base_url).rstrip('/')}/api/webhook/stripe"
+    return StripeCheckout(api_key=STRIPE_API_KEY, webhook_url=webhook_url)
+
+
 @app.post("/api/payments/create-checkout")
 async def create_checkout_session(request: Request, data: dict):
     """Create a Stripe checkout session for membership"""
@@ -852,8 +2886,8 @@ async def create_checkout_session(request: Request, data: dict):
     cancel_url = f"{origin_url}/membership?status=cancelled"
 
     # Initialize Stripe checkout
-    webhook_url = f"{str(request.base_url).rstrip('/')}/api/webhook/stripe"
-    stripe_checkout = StripeCheckout(api_key=STRIPE_API_KEY, webhook_url=webhook_url)
+    stripe_checkout = get_stripe_checkout(request)
+    from emergentintegrations.payments.stripe.checkout import CheckoutSessionRequest
 
     try:
         checkout_request = CheckoutSessionRequest(
@@ -868,7 +2902,7 @@ async def create_checkout_session(request: Request, data: dict):
             }
         )
 
-        session: CheckoutSessionResponse = await stripe_checkout.create_checkout_session(checkout_request)
+        session = await stripe_checkout.create_checkout_session(checkout_request)
 
         # Create payment transaction record
         now = datetime.now(timezone.utc).isoformat()
@@ -898,11 +2932,10 @@ async def get_payment_status(session_id: str, request: Request):
     if not STRIPE_API_KEY:
         raise HTTPException(500, "Stripe is not configured")
 
-    webhook_url = f"{str(request.base_url).rstrip('/')}/api/webhook/stripe"
-    stripe_checkout = StripeCheckout(api_key=STRIPE_API_KEY, webhook_url=webhook_url)
+    stripe_checkout = get_stripe_checkout(request)
 
     try:
-        status: CheckoutStatusResponse = await stripe_checkout.get_checkout_status(session_id)
+        status = await stripe_checkout.get_checkout_status(session_id)
 
         # Update transaction in database
         now = datetime.now(timezone.utc).isoformat()
@@ -957,8 +2990,7 @@ async def stripe_webhook(request: Request):
     body = await request.body()
     signature = request.headers.get("Stripe-Signature")
 
-    webhook_url = f"{str(request.base_url).rstrip('/')}/api/webhook/stripe"
-    stripe_checkout = StripeCheckout(api_key=STRIPE_API_KEY, webhook_url=webhook_url)
+    stripe_checkout = get_stripe_checkout(request)
 
     try:
         webhook_response = await stripe_checkout.handle_webhook(body, signature)
@@ -1029,27 +3061,157 @@ async def cancel_membership(request: Request):
     return {"message": "Membership cancelled successfully"}
 
 
+class DeletionWorker(BackgroundTask):
+    """Background task removing deleted accounts' data in bounded batches.
+
+    Jobs live in ``deletion_jobs`` and are claimed with a renewable lease, so
+    a job interrupted by a restart is picked up again by any worker. Each
+    batch deletes at most DELETION_BATCH_SIZE documents by _id and records
+    progress on the job, pausing DELETION_BATCH_PAUSE seconds in between to
+    spread the load.
+    """
+
+    def __init__(self, batch_size: int, pause: float):
+        super().__init__()
+        self.batch_size = batch_size
+        self.pause = pause
+        self.wakeup = asyncio.Event()
+
+    def wake(self):
+        self.wakeup.set()
+
+    async def _run(self):
+        while True:
+            job = await self._claim()
+            if job is None:
+                self.wakeup.clear()
+                try:
+                    await asyncio.wait_for(self.wakeup.wait(), DELETION_POLL_INTERVAL)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+            try:
+                await self._process(job)
+            except Exception:
+                # The lease expires and the job is retried from where it stopped
+                logger.exception("Deletion job for %s failed", job["userId"])
+                await asyncio.sleep(self.pause)
+
+    async def _claim(self):
+        now = datetime.now(timezone.utc)
+        return await deletion_jobs_col.find_one_and_update(
+            {"state": {"$in": ["pending", "running"]}, "leaseUntil": {"$lt": now.isoformat()}},
+            {"$set": {"state": "running", "leaseUntil": self._lease(now)}},
+            sort=[("leaseUntil", 1)],
+            return_document=ReturnDocument.AFTER,
+        )
+
+    @staticmethod
+    def _lease(now: datetime) -> str:
+        return (now + timedelta(seconds=DELETION_LEASE_SECONDS)).isoformat()
+
+    async def _delete_batch(self, collection, query: dict) -> int:
+        docs = await collection.find(query, {"_id": 1}).limit(self.batch_size).to_list(self.batch_size)
+        if not docs:
+            return 0
+        result = await collection.delete_many({"_id": {"$in": [d["_id"] for d in docs]}})
+        return result.deleted_count
+
+    async def _progress(self, job_id, step: str, counts: dict):
+        await deletion_jobs_col.update_one({"_id": job_id}, {
+            "$inc": {f"progress.{k}": v for k, v in counts.items()},
+            "$set": {"step": step, "leaseUntil": self._lease(datetime.now(timezone.utc))},
+        })
+        await asyncio.sleep(self.pause)
+
+    async def _process(self, job: dict):
+        uid = job["userId"]
+
+        # Matches first, each batch together with its conversations
+        while True:
+            matches = await matches_col.find({"users": uid}, {"_id": 1}).limit(self.batch_size).to_list(self.batch_size)
+            if not matches:
+                break
+            match_ids = [str(m["_id"]) for m in matches]
+            messages = 0
+            while deleted := await self._delete_batch(messages_col, {"matchId": {"$in": match_ids}}):
+                messages += deleted
+            result = await matches_col.delete_many({"_id": {"$in": [m["_id"] for m in matches]}})
+            stats_buffer.record(totals={"matches": -result.deleted_count})
+            await self._progress(job["_id"], "matches", {"matches": result.deleted_count, "messages": messages})
+
+        likes_query = {"$or": [{"fromUserId": uid}, {"toUserId": uid}]}
+        while deleted := await self._delete_batch(likes_col, likes_query):
+            stats_buffer.record(totals={"likes": -deleted})
+            await self._progress(job["_id"], "likes", {"likes": deleted})
+
+        while deleted := await self._delete_batch(payments_col, {"userId": uid}):
+            await self._progress(job["_id"], "payments", {"payments": deleted})
+
+        # Uids are stable, so an account registered again must not inherit the old seen filter
+        await seen_col.delete_one({"_id": uid})
+        seen_sets.cache.discard(uid)
+        await decks_col.delete_one({"userId": uid})
+        await users_col.delete_one({"firebaseUid": uid, "deletedAt": {"$exists": True}})
+        await deletion_jobs_col.update_one({"_id": job["_id"]}, {
+            "$set": {"state": "done", "step": "done", "finishedAt": datetime.now(timezone.utc).isoformat()},
+            "$unset": {"leaseUntil": ""},
+        })
+
+
+deletion_worker = DeletionWorker(DELETION_BATCH_SIZE, DELETION_BATCH_PAUSE)
+
+DELETION_JOB_PROJECTION = {"_id": 0, "userId": 1, "state": 1, "step": 1, "progress": 1, "createdAt": 1, "finishedAt": 1}
+
+
 @app.delete("/api/account/delete")
 async def delete_account(request: Request):
-    """Permanently delete user account and all associated data"""
-    uid = get_uid(request)
+    """Delete the user's account.
 
-    # Delete user's likes
-    await likes_col.delete_many({"$or": [{"fromUserId": uid}, {"toUserId": uid}]})
+    The account is tombstoned at once, which hides it everywhere. Likes,
+    matches, messages and payments are then removed in batches by the
+    deletion worker; progress is at GET /api/account/delete/status.
+    """
+    uid = get_uid(request)
+    now = datetime.now(timezone.utc).isoformat()
 
-    # Delete user's matches
-    await matches_col.delete_many({"users": uid})
+    user = await users_col.find_one_and_update(
+        {"firebaseUid": uid, **NOT_DELETED},
+        {"$set": {"deletedAt": now, "status": "deleted"}},
+        {"_id": 1},
+    )
+    if not user:
+        job = await deletion_jobs_col.find_one({"userId": uid}, DELETION_JOB_PROJECTION)
+        if job:
+            return {"message": "Account deletion in progress", "deletion": job}
+        raise HTTPException(404, "User not found")
 
-    # Delete user's payment transactions
-    await payments_col.delete_many({"userId": uid})
+    await deletion_jobs_col.update_one({"userId": uid}, {
+        "$set": {
+            "state": "pending",
+            "step": "queued",
+            "progress": {"matches": 0, "messages": 0, "likes": 0, "payments": 0},
+            "createdAt": now,
+            "leaseUntil": now,
+        },
+        "$unset": {"finishedAt": ""},
+    }, upsert=True)
+    stats_buffer.record(totals={"users": -1})
 
-    # Delete user account
-    result = await users_col.delete_one({"firebaseUid": uid})
+    deck_worker.remove_user(uid)
+    match_summary_worker.refresh(uid)  # hides the account from partners' inboxes
+    await unindex_bio(uid)
+    deletion_worker.wake()
+    return {"message": "Account deleted successfully", "deletion": {"state": "pending"}}
 
-    if result.deleted_count == 0:
-        raise HTTPException(404, "User not found")
 
-    return {"message": "Account deleted successfully"}
+@app.get("/api/account/delete/status")
+async def get_deletion_status(request: Request):
+    uid = get_uid(request)
+    job = await deletion_jobs_col.find_one({"userId": uid}, DELETION_JOB_PROJECTION)
+    if not job:
+        raise HTTPException(404, "No deletion job for this account")
+    return job
 
 
 @app.get("/api/account/membership")
@@ -0,0 +1,85 @@
+"""The batch scorer must return exactly what calculate_covenant_score does."""
+import random
+
+import pytest
+
+import server
+from covenant_codes import VALUES, VOCABULARIES, encode_profile
+from covenant_weights import DEFAULT_COMPILED, compile_weights
+
+VIEWERS = 150
+CANDIDATES = 200
+
+EXPERIMENT = compile_weights("experiment", {
+    "faithLevel": {"Very Serious": 30, "Practicing": 7},
+    "denominationMatch": 5,
+    "values": 45,
+    "noValues": 0,
+    "intentionDefault": 0,
+    "lifestyle": {"Modern": 9},
+})
+
+
+def random_user(rng, i):
+    user = {"firebaseUid": f"u{i}"}
+    for field, vocabulary in VOCABULARIES.items():
+        roll = rng.random()
+        if roll < 0.8:
+            user[field] = rng.choice(vocabulary)
+        elif roll < 0.9:
+            user[field] = "Unlisted"  # outside the vocabulary, encoded as 0
+    if rng.random() < 0.9:
+        pool = list(VALUES) + ["Gardening", "Poetry"]
+        user["values"] = rng.sample(pool, rng.randint(0, 6))
+    if rng.random() < 0.5:
+        user["covenantCodes"] = encode_profile(user)
+    return user
+
+
+def normalized(result):
+    """Shared values are listed in vocabulary order by the batch scorer and set order by the reference"""
+    reasons = []
+    for reason in result["reasons"]:
+        if reason.startswith("Shared Values: "):
+            reason = "Shared Values: " + ", ".join(sorted(reason[len("Shared Values: "):].split(", ")))
+        reasons.append(reason)
+    return {**result, "reasons": reasons}
+
+
+def population(seed):
+    rng = random.Random(seed)
+    return [random_user(rng, i) for i in range(VIEWERS)], [random_user(rng, i) for i in range(CANDIDATES)]
+
+
+@pytest.mark.parametrize("weights", [DEFAULT_COMPILED, EXPERIMENT], ids=["default", "experiment"])
+def test_batch_matches_reference(weights):
+    viewers, candidates = population(1)
+    for viewer in viewers:
+        batch = server.calculate_covenant_scores(viewer, candidates, weights)
+        expected = [server.calculate_covenant_score(viewer, c, weights) for c in candidates]
+        assert [normalized(r) for r in batch] == [normalized(r) for r in expected]
+
+
+@pytest.mark.parametrize("weights", [DEFAULT_COMPILED, EXPERIMENT], ids=["default", "experiment"])
+def test_reciprocal_matches_reference_in_both_directions(weights):
+    viewers, candidates = population(2)
+    for viewer in viewers:
+        batch = server.calculate_covenant_scores(viewer, candidates, weights, reciprocal=True)
+        for result, candidate in zip(batch, candidates):
+            forward = server.calculate_covenant_score(viewer, candidate, weights)
+            reverse = server.calculate_covenant_score(candidate, viewer, weights)["score"]
+            both = forward["score"] + reverse
+            assert result["reciprocal"] == {"forward": forward["score"], "reverse": reverse}
+            assert result["score"] == (2 * forward["score"] * reverse // both if both else 0)
+            assert normalized({**result, "score": forward["score"]}) == normalized(
+                {**forward, "reciprocal": result["reciprocal"]}
+            )
+
+
+def test_empty_viewer_and_no_candidates():
+    _, candidates = population(3)
+    assert server.calculate_covenant_scores(None, []) == []
+    batch = server.calculate_covenant_scores(None, candidates)
+    assert [normalized(r) for r in batch] == [
+        normalized(server.calculate_covenant_score(None, c)) for c in candidates
+    ]
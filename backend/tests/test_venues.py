@@ -0,0 +1,155 @@
+"""Nearby venue lookups against a local stand-in for the Places API."""
+import asyncio
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+import server
+
+
+class PlacesStandIn:
+    """Records each searchNearby request and answers with one place per call"""
+
+    def __init__(self):
+        self.requests = []
+        self.status = 200
+        self.delay = 0.0
+        stand_in = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+                stand_in.requests.append({"body": body, "key": self.headers.get("X-Goog-Api-Key")})
+                time.sleep(stand_in.delay)
+                payload = json.dumps({"places": [{
+                    "id": f"place-{len(stand_in.requests)}",
+                    "displayName": {"text": "Chapel Coffee"},
+                    "location": body["locationRestriction"]["circle"]["center"],
+                    "types": body["includedTypes"],
+                }]}).encode()
+                self.send_response(stand_in.status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+
+            def log_message(self, *args):
+                pass
+
+        self.httpd = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.url = f"http://127.0.0.1:{self.httpd.server_address[1]}/v1/places:searchNearby"
+        threading.Thread(target=self.httpd.serve_forever, daemon=True).start()
+
+    def close(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+@pytest.fixture
+def places(monkeypatch):
+    stand_in = PlacesStandIn()
+    monkeypatch.setattr(server, "GOOGLE_PLACES_URL", stand_in.url)
+    monkeypatch.setattr(server, "GOOGLE_MAPS_API_KEY", "test-key")
+    monkeypatch.setattr(server, "venue_cache", server.TTLCache(16, 60))
+    yield stand_in
+    stand_in.close()
+
+
+def run(coro):
+    async def with_client():
+        try:
+            return await coro
+        finally:
+            await server.close_http_client()
+
+    return asyncio.run(with_client())
+
+
+def nearby(latitude=30.2672, longitude=-97.7431, radius=1500, place_types="cafe,park"):
+    return server.get_nearby_venues(
+        latitude=latitude, longitude=longitude, radius=radius, place_types=place_types
+    )
+
+
+def test_cache_key_snaps_to_tile_and_radius_bucket():
+    key = server.venue_cache_key(30.2672, -97.7431, 1200, ["park", "cafe", "park"])
+    assert key == server.venue_cache_key(30.2691, -97.7449, 1499, ["cafe", "park"])
+    assert key[1] == 1500 and key[2] == ("cafe", "park")
+    assert server.venue_cache_key(30.2672, -97.7431, 1, ["cafe"])[1] == server.VENUE_RADIUS_BUCKET
+    assert server.venue_cache_key(30.2872, -97.7431, 1200, ["cafe"])[0] != key[0]
+
+
+def test_nearby_users_share_one_lookup(places):
+    async def lookups():
+        first = await nearby(30.2672, -97.7431, 1200, "park,cafe")
+        second = await nearby(30.2691, -97.7449, 1499, "cafe,park")
+        return first, second
+
+    first, second = run(lookups())
+    assert first == second and first["source"] == "google"
+    assert len(places.requests) == 1
+    request = places.requests[0]
+    assert request["key"] == "test-key"
+    circle = request["body"]["locationRestriction"]["circle"]
+    assert circle == {"center": {"latitude": 30.27, "longitude": -97.74}, "radius": 1500.0}
+    assert request["body"]["includedTypes"] == ["cafe", "park"]
+
+
+def test_concurrent_identical_lookups_are_coalesced(places):
+    places.delay = 0.2
+
+    async def lookups():
+        return await asyncio.gather(*[nearby() for _ in range(10)])
+
+    results = run(lookups())
+    assert len(places.requests) == 1
+    assert all(r == results[0] and r["source"] == "google" for r in results)
+
+
+def test_entries_expire_after_the_ttl(places, monkeypatch):
+    monkeypatch.setattr(server, "venue_cache", server.TTLCache(16, 0.2))
+
+    async def lookups():
+        await nearby()
+        await nearby()
+        await asyncio.sleep(0.3)
+        await nearby()
+
+    run(lookups())
+    assert len(places.requests) == 2
+
+
+def test_least_recently_used_tile_is_evicted(places, monkeypatch):
+    monkeypatch.setattr(server, "venue_cache", server.TTLCache(2, 60))
+
+    async def lookups():
+        for latitude in (30.0, 31.0, 30.0, 32.0, 31.0, 30.0):
+            await nearby(latitude=latitude)
+
+    run(lookups())
+    # 30 and 31 miss; 30 hits; 32 evicts 31, which then misses and evicts 30
+    centres = [r["body"]["locationRestriction"]["circle"]["center"]["latitude"] for r in places.requests]
+    assert centres == [30.0, 31.0, 32.0, 31.0, 30.0]
+
+
+def test_failed_lookup_falls_back_to_mock_venues_and_is_not_cached(places):
+    places.status = 500
+
+    async def lookups():
+        failed = await nearby()
+        places.status = 200
+        return failed, await nearby()
+
+    failed, recovered = run(lookups())
+    assert failed["source"] == "mock" and len(failed["places"]) == 3
+    assert recovered["source"] == "google"
+    assert len(places.requests) == 2
+
+
+def test_unreachable_api_falls_back_to_mock_venues(places, monkeypatch):
+    places.close()
+    monkeypatch.setattr(server, "GOOGLE_PLACES_URL", places.url)
+    assert run(nearby())["source"] == "mock"